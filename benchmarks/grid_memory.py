@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""Peak-memory benchmark for parsing the forecastGridData payload.
+
+Serves a gridpoints document from a local HTTP server and, in a fresh child
+process per mode, fetches it either with a full .json() parse ("full", the
+old behaviour) or with nws.fetch_grid_layers() keeping only the layers the
+GUI or the LED script read ("stream"). Reports each child's peak RSS.
+
+    python benchmarks/grid_memory.py                  # synthetic ~600 KB payload
+    python benchmarks/grid_memory.py --file grid.json # a recorded response
+
+Streaming needs the optional `ijson` package; without it "stream" falls back
+to a full parse and the two numbers will match.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+LAYER_SETS = {
+    "gui": (
+        'dewpoint', 'relativeHumidity', 'skyCover', 'windSpeed', 'windDirection', 'windGust',
+        'maxTemperature', 'minTemperature', 'apparentTemperature', 'surfacePressure',
+        'probabilityOfPrecipitation', 'hazards',
+    ),
+    "leds": ('quantitativePrecipitation',),
+}
+
+
+def synthetic_payload(layers=60, periods=160):
+    """A gridpoints document shaped like api.weather.gov's, with `layers` numeric layers."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    names = list(LAYER_SETS["gui"]) + ['quantitativePrecipitation']
+    names += [f"extraLayer{i}" for i in range(layers - len(names))]
+    properties = {"updateTime": start.isoformat()}
+    for name in names:
+        properties[name] = {
+            "uom": "wmoUnit:degC",
+            "values": [
+                {"validTime": f"{(start + timedelta(hours=h)).isoformat()}/PT1H", "value": round(h * 0.37 % 40, 2)}
+                for h in range(periods)
+            ],
+        }
+    return {"type": "Feature", "geometry": None, "properties": properties}
+
+
+def peak_rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode, url, layer_set):
+    from weather import nws
+    nws.get_session()  # requests and ijson are imported lazily; load them before the baseline
+    nws._get_ijson()
+    before = peak_rss_kb()
+    if mode == "full":
+        properties = nws.fetch_json(url)['properties']
+        kept = {name: properties[name] for name in LAYER_SETS[layer_set] if name in properties}
+        del properties
+    else:
+        kept = nws.fetch_grid_layers(url, LAYER_SETS[layer_set])
+    print(json.dumps({"baseline_kb": before, "peak_kb": peak_rss_kb(), "layers": len(kept)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="JSON file with a recorded forecastGridData response.")
+    parser.add_argument("--layers", choices=sorted(LAYER_SETS), default="gui", help="Which entry point's layers to keep.")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], args.layers)
+        return
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            body = f.read()
+    else:
+        body = json.dumps(synthetic_payload()).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/geo+json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/gridpoints"
+
+    print(f"Payload: {len(body) / 1024:.0f} KiB, keeping the '{args.layers}' layers")
+    for mode in ("full", "stream"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--layers", args.layers, "--child", mode, url],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out)
+        delta = result["peak_kb"] - result["baseline_kb"]
+        print(f"{mode:>6}: peak RSS {result['peak_kb'] / 1024:6.1f} MiB (+{delta / 1024:.1f} MiB for the parse, {result['layers']} layers kept)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
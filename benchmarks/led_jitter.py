@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""LED blink timing benchmark on the simulated GPIO backend.
+
+Runs the LED engine against weather.gpio.SimulatedGPIO for every
+precipitation pattern and reports, from the recorded pin transitions:
+
+* blink period accuracy (mean measured period vs. the pattern's period),
+* period jitter (standard deviation and worst deviation of the period),
+* how late the engine fired transitions relative to their deadlines, and
+* CPU time used per second of wall time while blinking.
+
+    python benchmarks/led_jitter.py               # >= 6 s and 4 periods per pattern
+    python benchmarks/led_jitter.py --seconds 30 --patterns rain:heavy
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from weather import leds  # noqa: E402
+from weather.gpio import SimulatedGPIO  # noqa: E402
+from weather.ledengine import PATTERNS, LedEngine  # noqa: E402
+
+PRECIP_TYPES = ("rain", "snow", "sleet")
+
+
+def expected_period(precip_type, intensity):
+    on_time, off_time = PATTERNS[intensity]
+    return on_time if precip_type == "sleet" else on_time + off_time
+
+
+def measure(precip_type, intensity, seconds):
+    sim = SimulatedGPIO()
+    for pin in leds.LED_PINS:
+        sim.setup(pin, sim.OUT)
+    engine = LedEngine(sim, leds.LED_PINS, rain_pin=leds.GREEN_LED, snow_pin=leds.BLUE_LED)
+    engine.start()
+    cpu_start, wall_start = time.process_time(), time.monotonic()
+    engine.set_target(leds.RED_LED, precip_type, intensity)
+    time.sleep(seconds)
+    engine.stop()
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+
+    # The blinking pin's rising edges give one timestamp per period.
+    blink_pin = leds.BLUE_LED if precip_type == "snow" else leds.GREEN_LED
+    rises = [t for t, level in sim.transitions(blink_pin) if level]
+    periods = [b - a for a, b in zip(rises, rises[1:])]
+    expected = expected_period(precip_type, intensity)
+    stats = engine.jitter_stats() or {}
+    return {
+        "expected": expected,
+        "periods": len(periods),
+        "mean_period": statistics.mean(periods) if periods else float("nan"),
+        "stdev_ms": 1000 * statistics.pstdev(periods) if periods else float("nan"),
+        "worst_ms": 1000 * max((abs(p - expected) for p in periods), default=float("nan")),
+        "late_p99_ms": stats.get("p99_ms", float("nan")),
+        "late_max_ms": stats.get("max_ms", float("nan")),
+        "cpu_pct": 100 * cpu / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LED blink timing on the simulated GPIO backend.")
+    parser.add_argument("--seconds", type=float, default=6, help="How long to run each pattern.")
+    parser.add_argument("--patterns", nargs="*", metavar="TYPE:INTENSITY",
+                        help="Subset to run, e.g. rain:heavy sleet:light (default: all).")
+    args = parser.parse_args()
+
+    wanted = args.patterns or [f"{t}:{i}" for t in PRECIP_TYPES for i in PATTERNS]
+    print(f"{'pattern':<16}{'period':>9}{'measured':>10}{'n':>4}{'jitter':>10}{'worst':>10}{'late p99':>10}{'late max':>10}{'cpu':>7}")
+    for pattern in wanted:
+        precip_type, intensity = pattern.split(":")
+        # Run long enough for at least four full periods of slow patterns.
+        r = measure(precip_type, intensity, max(args.seconds, 4.2 * expected_period(precip_type, intensity)))
+        print(f"{pattern:<16}{r['expected']:>8.3f}s{r['mean_period']:>9.4f}s{r['periods']:>4}"
+              f"{r['stdev_ms']:>8.2f}ms{r['worst_ms']:>8.2f}ms{r['late_p99_ms']:>8.2f}ms{r['late_max_ms']:>8.2f}ms"
+              f"{r['cpu_pct']:>6.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+"""Local stand-in for api.weather.gov and radar.weather.gov.
+
+Replays a directory of fixture responses so that refresh-path changes can be
+measured offline and repeatably. Point the package at it with
+WEATHER_API_BASE and WEATHER_RADAR_BASE (both set to the printed base URL).
+
+    python benchmarks/nws_standin.py --port 8800                  # synthetic fixtures
+    python benchmarks/nws_standin.py --fixtures DIR --latency 80 --jitter 40 --error-rate 0.05
+    python benchmarks/nws_standin.py --record DIR                 # capture live responses once
+
+A fixture directory holds one file per endpoint (see ROUTES). "{BASE}" in a
+fixture is replaced with the server's own base URL, so recorded documents
+link back to the stand-in. Without --fixtures, NWS-shaped synthetic fixtures
+with timestamps around "now" are generated into a temporary directory.
+
+Knobs: --latency/--jitter (ms added before every response), --error-rate
+(fraction answered with 503), --no-etag (omit ETag/Last-Modified and ignore
+conditional requests), --max-age (Cache-Control), --no-gzip. GET /_stats
+returns request and byte counters as JSON; POST /_stats resets them.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+ROUTES = (
+    (re.compile(r"^/points/"), "points.json"),
+    (re.compile(r"/forecast/hourly$"), "forecast_hourly.json"),
+    (re.compile(r"/forecast$"), "forecast.json"),
+    (re.compile(r"^/gridpoints/"), "gridpoints.json"),
+    (re.compile(r"^/radar/stations"), "radar_stations.json"),
+    (re.compile(r"^/alerts/"), "alerts.json"),
+    (re.compile(r"_loop\.gif$"), "radar_loop.gif"),
+    (re.compile(r"\.gif$"), "radar_image.gif"),
+)
+GRID_LAYERS = (
+    'temperature', 'dewpoint', 'maxTemperature', 'minTemperature', 'relativeHumidity', 'apparentTemperature',
+    'heatIndex', 'windChill', 'skyCover', 'windDirection', 'windSpeed', 'windGust', 'probabilityOfPrecipitation',
+    'quantitativePrecipitation', 'iceAccumulation', 'snowfallAmount', 'snowLevel', 'ceilingHeight', 'visibility',
+    'transportWindSpeed', 'transportWindDirection', 'mixingHeight', 'hainesIndex', 'lightningActivityLevel',
+    'twentyFootWindSpeed', 'twentyFootWindDirection', 'waveHeight', 'primarySwellHeight', 'windWaveHeight',
+    'probabilityOfThunder', 'davisStabilityIndex', 'atmosphericDispersionIndex',
+    'lowVisibilityOccurrenceRiskIndex', 'stability', 'redFlagThreatIndex', 'surfacePressure',
+)
+
+
+def synthesize(directory, seed=1):
+    """Write NWS-shaped fixtures (sizes close to real responses) into `directory`."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    grid = "{BASE}/gridpoints/BGM/50,60"
+
+    def write(name, document):
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump(document, f, indent=4)  # NWS pretty-prints its JSON
+
+    write("points.json", {"type": "Feature", "properties": {
+        "@id": "{BASE}/points/41.93,-77.05", "cwa": "BGM", "gridId": "BGM", "gridX": 50, "gridY": 60,
+        "forecast": f"{grid}/forecast", "forecastHourly": f"{grid}/forecast/hourly", "forecastGridData": grid,
+        "observationStations": f"{grid}/stations", "forecastZone": "{BASE}/zones/forecast/PAZ006",
+        "county": "{BASE}/zones/county/PAC117", "timeZone": "America/New_York", "radarStation": "KBGM",
+        "relativeLocation": {"type": "Feature", "properties": {"city": "Wellsboro", "state": "PA"}},
+    }})
+
+    def period(number, start, hours, name=""):
+        temperature = round(50 + 15 * rng.random())
+        return {
+            "number": number, "name": name, "startTime": start.isoformat(),
+            "endTime": (start + timedelta(hours=hours)).isoformat(), "isDaytime": 6 <= start.hour < 18,
+            "temperature": temperature, "temperatureUnit": "F", "temperatureTrend": None,
+            "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": rng.choice([0, 10, 20, 40, 70])},
+            "dewpoint": {"unitCode": "wmoUnit:degC", "value": round(rng.uniform(0, 15), 1)},
+            "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": rng.randint(40, 100)},
+            "windSpeed": f"{rng.randint(0, 20)} mph", "windDirection": rng.choice(["N", "NW", "W", "SW", "S"]),
+            "icon": "{BASE}/icons/land/day/rain_showers,40?size=small",
+            "shortForecast": rng.choice(["Sunny", "Partly Cloudy", "Chance Rain Showers", "Light Snow", "Mostly Cloudy"]),
+            "detailedForecast": "",
+        }
+
+    hourly = [period(i + 1, now + timedelta(hours=i), 1) for i in range(156)]
+    write("forecast_hourly.json", {"type": "Feature", "properties": {
+        "updated": now.isoformat(), "updateTime": now.isoformat(), "units": "us", "periods": hourly}})
+    daily = []
+    for i in range(14):
+        p = period(i + 1, now + timedelta(hours=12 * i), 12, name=f"Period {i + 1}")
+        p["detailedForecast"] = f"{p['shortForecast']}. High near {p['temperature']}, with winds around {p['windSpeed']}. " * 3
+        daily.append(p)
+    write("forecast.json", {"type": "Feature", "properties": {
+        "updated": now.isoformat(), "updateTime": now.isoformat(), "units": "us", "periods": daily}})
+
+    properties = {"@id": grid, "updateTime": now.isoformat(), "validTimes": f"{now.isoformat()}/P7DT12H"}
+    for name in GRID_LAYERS:
+        values, t = [], now - timedelta(hours=6)
+        while t < now + timedelta(days=7):
+            hours = rng.choice([1, 1, 2, 3, 6])
+            values.append({"validTime": f"{t.isoformat()}/PT{hours}H", "value": round(rng.uniform(0, 30), 6)})
+            t += timedelta(hours=hours)
+        properties[name] = {"uom": "wmoUnit:degC", "values": values}
+    properties["hazards"] = {"values": []}
+    properties["weather"] = {"values": [{"validTime": f"{now.isoformat()}/PT6H", "value": [
+        {"coverage": "chance", "weather": "rain_showers", "intensity": "light", "visibility": {"unitCode": "wmoUnit:km", "value": None}}]}]}
+    write("gridpoints.json", {"type": "Feature", "geometry": None, "properties": properties})
+
+    stations = [{"type": "Feature", "geometry": {"type": "Point", "coordinates": [rng.uniform(-125, -67), rng.uniform(25, 49)]},
+                 "properties": {"id": f"K{i:03d}", "name": f"Station {i}", "stationType": "WSR-88D"}} for i in range(200)]
+    stations.append({"type": "Feature", "geometry": {"type": "Point", "coordinates": [-75.98, 42.2]},
+                     "properties": {"id": "KBGM", "name": "Binghamton", "stationType": "WSR-88D"}})
+    write("radar_stations.json", {"type": "FeatureCollection", "features": stations})
+    write("alerts.json", {"type": "FeatureCollection", "features": [], "title": "Current watches, warnings, and advisories"})
+
+    from PIL import Image, ImageDraw
+    frames = []
+    for i in range(10):
+        img = Image.new("P", (600, 550), 0)
+        img.putpalette([rng.randrange(256) for _ in range(768)])
+        draw = ImageDraw.Draw(img)
+        for _ in range(200):
+            x, y = rng.randrange(600), rng.randrange(550)
+            draw.ellipse((x, y, x + rng.randrange(5, 40), y + rng.randrange(5, 40)), fill=rng.randrange(1, 16))
+        frames.append(img)
+    frames[-1].save(os.path.join(directory, "radar_image.gif"))
+    frames[0].save(os.path.join(directory, "radar_loop.gif"), save_all=True, append_images=frames[1:], duration=250, loop=0)
+
+
+def record(directory):
+    """Capture live responses for config.LATITUDE/LONGITUDE into `directory`."""
+    from weather import nws
+    from weather.config import LATITUDE, LONGITUDE
+    headers = {'User-Agent': 'weather-suite fixture recorder'}
+    os.makedirs(directory, exist_ok=True)
+
+    def save(name, url):
+        body = nws.fetch(url, headers=headers).content
+        if name.endswith(".json"):
+            body = body.replace(b"https://api.weather.gov", b"{BASE}").replace(b"https://radar.weather.gov", b"{BASE}")
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(body)
+        print(f"{name}: {len(body)} bytes from {url}")
+
+    points = nws.fetch_json(f"https://api.weather.gov/points/{LATITUDE},{LONGITUDE}", headers=headers)['properties']
+    save("points.json", f"https://api.weather.gov/points/{LATITUDE},{LONGITUDE}")
+    save("forecast_hourly.json", points['forecastHourly'])
+    save("forecast.json", points['forecast'])
+    save("gridpoints.json", points['forecastGridData'])
+    save("radar_stations.json", "https://api.weather.gov/radar/stations")
+    save("alerts.json", f"https://api.weather.gov/alerts/active?point={LATITUDE},{LONGITUDE}")
+    station = points['radarStation']
+    save("radar_image.gif", f"https://radar.weather.gov/ridge/standard/{station}_0.gif")
+    save("radar_loop.gif", f"https://radar.weather.gov/ridge/standard/{station}_loop.gif")
+
+
+class StandIn:
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, etag=True, max_age=3600, compress=True):
+        self.fixtures = fixtures
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.etag, self.max_age, self.compress = etag, max_age, compress
+        self.base = None
+        self.bodies = {}  # fixture name -> (raw body, gzipped body or None, etag)
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {"requests": 0, "bytes": 0, "not_modified": 0, "errors": 0}
+
+    def body(self, name):
+        if name not in self.bodies:
+            with open(os.path.join(self.fixtures, name), "rb") as f:
+                raw = f.read()
+            if name.endswith(".json"):
+                raw = raw.replace(b"{BASE}", self.base.encode())
+            packed = gzip.compress(raw, 6) if self.compress and name.endswith(".json") else None
+            self.bodies[name] = (raw, packed, '"%s"' % hashlib.md5(raw).hexdigest())
+        return self.bodies[name]
+
+    def handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+            def send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with standin.lock:
+                    standin.stats["requests"] += 1
+                    standin.stats["bytes"] += len(body)
+
+            def do_POST(self):
+                standin.reset()
+                self.send(204)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/_stats":
+                    with standin.lock:
+                        body = json.dumps(standin.stats).encode()
+                    self.send(200, body, [("Content-Type", "application/json")])
+                    return
+                delay = standin.latency + random.uniform(-standin.jitter, standin.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                name = next((name for pattern, name in ROUTES if pattern.search(path)), None)
+                if name is None:
+                    self.send(404)
+                    return
+                if random.random() < standin.error_rate:
+                    with standin.lock:
+                        standin.stats["errors"] += 1
+                    self.send(503, b'{"status": 503}', [("Content-Type", "application/problem+json")])
+                    return
+                raw, packed, etag = standin.body(name)
+                headers = [("Cache-Control", f"public, max-age={standin.max_age}")]
+                if standin.etag:
+                    headers += [("ETag", etag), ("Last-Modified", standin.last_modified)]
+                    if self.headers.get("If-None-Match") == etag:
+                        with standin.lock:
+                            standin.stats["not_modified"] += 1
+                        self.send(304, b"", headers)
+                        return
+                content_type = "application/geo+json" if name.endswith(".json") else "image/gif"
+                headers.append(("Content-Type", content_type))
+                if packed is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    self.send(200, packed, headers + [("Content-Encoding", "gzip")])
+                else:
+                    self.send(200, raw, headers)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, port=0):
+        """Serve from a daemon thread; returns the base URL."""
+        server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self.base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--fixtures", help="fixture directory (default: synthesize into a temp dir)")
+    parser.add_argument("--record", metavar="DIR", help="capture live responses into DIR and exit")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- ms of uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--max-age", type=int, default=3600, help="Cache-Control max-age in seconds")
+    parser.add_argument("--no-etag", action="store_true", help="omit validators and ignore conditional requests")
+    parser.add_argument("--no-gzip", action="store_true", help="never compress responses")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return
+    fixtures = args.fixtures
+    if fixtures is None:
+        fixtures = tempfile.mkdtemp(prefix="nws-fixtures-")
+        synthesize(fixtures)
+    standin = StandIn(fixtures, args.latency / 1000, args.jitter / 1000, args.error_rate,
+                      not args.no_etag, args.max_age, not args.no_gzip)
+    print(standin.start(args.port), flush=True)  # first line of output: the base URL
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+"""End-to-end refresh benchmark against the local NWS stand-in.
+
+Starts benchmarks/nws_standin.py and, in a fresh child process per scenario,
+runs the real refresh path against it:
+
+    gui    gui.get_weather_data()             (points, hourly, forecast, grid)
+    leds   leds.get_weather_data()            (hourly, grid, LED schedule)
+    app    WeatherApp.update_weather()        (the above plus radar and Tk render;
+                                               needs $DISPLAY, e.g. under xvfb-run)
+
+Every iteration is a cold refresh: the in-memory product cache is cleared,
+so each one downloads what a scheduled refresh would when everything is due.
+The /points lookup and station index stay cached after a warm-up iteration,
+as they do in the real tools. Reports p50/p99 latency, bytes on the wire per
+refresh (counted by the stand-in), CPU time per refresh and peak RSS.
+
+    python benchmarks/refresh_e2e.py
+    python benchmarks/refresh_e2e.py --iterations 50 --latency 80 --jitter 40
+    python benchmarks/refresh_e2e.py --fixtures DIR --error-rate 0.05 --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+SCENARIOS = ("gui", "leds", "app")
+
+
+def peak_rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def child(scenario, iterations):
+    from weather import config, report
+
+    def cold():
+        report._products.clear()
+        report.refresh_schedule.endpoints.clear()
+
+    if scenario == "gui":
+        from weather import gui
+        def refresh():
+            if gui.get_weather_data(config.LATITUDE, config.LONGITUDE) is None: raise RuntimeError("refresh failed")
+    elif scenario == "leds":
+        from weather import leds
+        def refresh():
+            if leds.get_weather_data(config.LATITUDE, config.LONGITUDE) is None: raise RuntimeError("refresh failed")
+    else:
+        if not os.environ.get("DISPLAY"):
+            print(json.dumps({"skipped": "no $DISPLAY (run under xvfb-run)"}))
+            return
+        from weather import gui
+        app = gui.WeatherApp()
+        def refresh():
+            app.update_weather()
+            while app.fetch_in_progress:  # poll_results() clears this once the render is done
+                app.update()
+                time.sleep(0.001)
+        while app.fetch_in_progress:
+            app.update()
+            time.sleep(0.001)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cold()
+        refresh()  # warm-up: /points, station index, imports and connection set-up
+        latencies, failures = [], 0
+        cpu_start = cpu_seconds()
+        for _ in range(iterations):
+            cold()
+            start = time.perf_counter()
+            try:
+                refresh()
+            except RuntimeError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+        cpu = cpu_seconds() - cpu_start
+    print(json.dumps({"latencies": latencies, "failures": failures, "cpu": cpu, "peak_kb": peak_rss_kb()}))
+
+
+def stand_in_stats(base, reset=False):
+    request = urllib.request.Request(f"{base}/_stats", method="POST" if reset else "GET")
+    with urllib.request.urlopen(request) as response:
+        return None if reset else json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--fixtures", help="recorded fixture directory (default: synthetic)")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms the stand-in adds to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- ms of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses that are 503s")
+    parser.add_argument("--no-etag", action="store_true")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.iterations)
+        return
+
+    command = [sys.executable, os.path.join(HERE, "nws_standin.py"), "--latency", str(args.latency),
+               "--jitter", str(args.jitter), "--error-rate", str(args.error_rate)]
+    if args.fixtures: command += ["--fixtures", args.fixtures]
+    if args.no_etag: command.append("--no-etag")
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    results = {}
+    try:
+        base = server.stdout.readline().strip()
+        print(f"Stand-in at {base}; {args.iterations} cold refreshes per scenario, "
+              f"latency {args.latency:.0f}±{args.jitter:.0f} ms, error rate {args.error_rate:.0%}")
+        print(f"{'scenario':>8} {'p50 ms':>8} {'p99 ms':>8} {'KiB/refresh':>12} {'requests':>9} {'CPU ms':>8} {'peak MiB':>9} {'failed':>7}")
+        for scenario in args.scenarios:
+            with tempfile.TemporaryDirectory() as cache_home:
+                env = dict(os.environ, WEATHER_API_BASE=base, WEATHER_RADAR_BASE=base, XDG_CACHE_HOME=cache_home,
+                           WEATHER_BROKER_SOCKET=os.path.join(cache_home, "no-broker.sock"))
+                stand_in_stats(base, reset=True)
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", scenario,
+                                      "--iterations", str(args.iterations)], env=env, check=True,
+                                     capture_output=True, text=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                if "skipped" in result:
+                    print(f"{scenario:>8}  skipped: {result['skipped']}")
+                    results[scenario] = result
+                    continue
+                wire = stand_in_stats(base)
+                n = args.iterations + 1  # the stand-in also served the warm-up
+                result.update({
+                    "p50_ms": 1000 * percentile(result["latencies"], 0.5),
+                    "p99_ms": 1000 * percentile(result["latencies"], 0.99),
+                    "bytes_per_refresh": wire["bytes"] / n,
+                    "requests_per_refresh": wire["requests"] / n,
+                    "cpu_ms_per_refresh": 1000 * result["cpu"] / args.iterations,
+                })
+                results[scenario] = result
+                print(f"{scenario:>8} {result['p50_ms']:8.1f} {result['p99_ms']:8.1f} {result['bytes_per_refresh'] / 1024:12.1f} "
+                      f"{result['requests_per_refresh']:9.1f} {result['cpu_ms_per_refresh']:8.1f} {result['peak_kb'] / 1024:9.1f} "
+                      f"{result['failures']:7d}")
+    finally:
+        server.terminate()
+        server.wait()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""Startup benchmark for the weather-gui and weather-leds entry points.
+
+For each entry-point module it reports, over several fresh interpreters:
+
+* the module's cumulative import time from `python -X importtime`,
+* interpreter wall time to finish that import, and
+* wall time until the first NWS request is ready to go out (the pooled
+  session is built, so `requests` has been imported, but nothing is sent).
+
+It fails (exit status 1) when a dependency that should be deferred shows up
+at import time, or when --baseline is given and an import got more than
+--tolerance slower than the recorded baseline.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --baseline startup-baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+TARGETS = {"weather-gui": "weather.gui", "weather-leds": "weather.leds"}
+# Heavy dependencies that must only be imported by the code paths that need them.
+DEFERRED = ("requests", "urllib3", "PIL", "RPi", "concurrent.futures", "ijson", "brotli")
+
+FIRST_FETCH_CHILD = """
+import os, sys, time
+from weather import nws
+def first_fetch(url, *args, **kwargs):
+    nws.get_session()
+    print(time.time(), flush=True)
+    os._exit(0)
+nws.fetch = first_fetch
+module = __import__(sys.argv[1], fromlist=["get_weather_data"])
+module.get_weather_data(41.93, -77.05)
+"""
+
+
+def run_importtime(module, env):
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=ROOT, env=env,
+    )
+    wall = time.time() - start
+    cumulative, imported = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        imported.add(name.strip())
+        if name.strip() == module and cum.strip().isdigit():
+            cumulative = int(cum) / 1000
+    return cumulative, wall * 1000, imported
+
+
+def run_first_fetch(module, env):
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_FETCH_CHILD, module],
+        capture_output=True, text=True, cwd=ROOT, env=env,
+    )
+    try:
+        return (float(proc.stdout.strip().splitlines()[-1]) - start) * 1000
+    except (IndexError, ValueError):
+        print(f"  first-fetch probe failed for {module}: {proc.stderr.strip()[-300:]}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and guard start-up cost of the console scripts.")
+    parser.add_argument("-n", "--runs", type=int, default=7, help="Fresh interpreters per measurement.")
+    parser.add_argument("--baseline", help="JSON file to compare against; written if it does not exist.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. the baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="")
+    # An empty cache directory makes /points the first request, as on a fresh install.
+    env["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="weather-startup-")
+
+    failed = False
+    report = {}
+    for script, module in TARGETS.items():
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, env=env)  # warm .pyc
+        imports, walls, leaked = [], [], set()
+        for _ in range(args.runs):
+            cumulative, wall, imported = run_importtime(module, env)
+            imports.append(cumulative)
+            walls.append(wall)
+            leaked |= {dep for dep in DEFERRED for name in imported if name == dep or name.startswith(dep + ".")}
+        fetches = [t for t in (run_first_fetch(module, env) for _ in range(args.runs)) if t is not None]
+        report[script] = {
+            "import_ms": statistics.median(imports),
+            "interpreter_ms": statistics.median(walls),
+            "first_fetch_ms": statistics.median(fetches) if fetches else None,
+        }
+        r = report[script]
+        first_fetch = f"{r['first_fetch_ms']:.1f} ms" if r["first_fetch_ms"] is not None else "n/a"
+        print(f"{script:>13}: import {r['import_ms']:.1f} ms, interpreter+import {r['interpreter_ms']:.1f} ms, "
+              f"first request ready {first_fetch} (median of {args.runs})")
+        if leaked:
+            failed = True
+            print(f"  REGRESSION: imported at module load: {', '.join(sorted(leaked))}")
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            with open(args.baseline, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote baseline to {args.baseline}")
+        else:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            for script, r in report.items():
+                base = baseline.get(script, {}).get("import_ms")
+                if base and r["import_ms"] > base * (1 + args.tolerance):
+                    failed = True
+                    print(f"  REGRESSION: {script} import {r['import_ms']:.1f} ms vs. baseline {base:.1f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,52 @@
 #!/usr/bin/python3
 from PIL import Image, ImageDraw
+import json
 import os
 
 # --- Configuration ---
 ICON_DIR = "icons"
 ICON_SIZE = (24, 24)
+# Sizes the GUI displays icons at; each gets its own atlas_<size>.png. Add e.g. 40 for 2x DPI.
+ATLAS_SIZES = [20]
+ATLAS_COLUMNS = 8
 COLOR_FG = "#ECEFF4"
 COLOR_RED = "#BF616A"
 COLOR_BLUE = "#5E81AC"
 COLOR_YELLOW = "#EBCB8B"
 
 def create_icon(filename, draw_func):
-    """Creates a single icon image."""
+    """Creates a single icon image and returns it."""
     image = Image.new("RGBA", ICON_SIZE, (0, 0, 0, 0))
     draw = ImageDraw.Draw(image)
     draw_func(draw)
     filepath = os.path.join(ICON_DIR, filename)
     image.save(filepath)
     print(f"Generated {filepath}")
+    return image
+
+def create_atlas(icons):
+    """Packs icons into one sprite sheet per display size plus an atlas.json index.
+
+    `icons` maps an icon name (the PNG filename without extension) to its
+    full-size image. The index maps each size to the sheet's filename and
+    every icon's (x, y, width, height) box within it.
+    """
+    index = {}
+    names = sorted(icons)
+    rows = (len(names) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+    for size in ATLAS_SIZES:
+        sheet = Image.new("RGBA", (ATLAS_COLUMNS * size, rows * size), (0, 0, 0, 0))
+        boxes = {}
+        for i, name in enumerate(names):
+            x, y = (i % ATLAS_COLUMNS) * size, (i // ATLAS_COLUMNS) * size
+            sheet.paste(icons[name].resize((size, size), Image.LANCZOS), (x, y))
+            boxes[name] = [x, y, size, size]
+        filename = f"atlas_{size}.png"
+        sheet.save(os.path.join(ICON_DIR, filename), optimize=True)
+        index[str(size)] = {"file": filename, "icons": boxes}
+        print(f"Generated {os.path.join(ICON_DIR, filename)}")
+    with open(os.path.join(ICON_DIR, "atlas.json"), "w") as f:
+        json.dump(index, f, sort_keys=True)
 
 def draw_temp(draw):
     draw.rectangle((8, 4, 16, 16), fill=None, outline=COLOR_FG, width=2)
@@ -87,24 +116,27 @@ def main():
     if not os.path.exists(ICON_DIR):
         os.makedirs(ICON_DIR)
 
-    create_icon("temp.png", draw_temp)
-    create_icon("humidity.png", draw_humidity)
-    create_icon("wind.png", draw_wind)
-    create_icon("sky.png", draw_sky)
-    create_icon("high_temp.png", draw_high_temp)
-    create_icon("low_temp.png", draw_low_temp)
-    create_icon("hazard.png", draw_hazard)
-    create_icon("pressure.png", draw_pressure)
+    icons = {}
+    icons["temp"] = create_icon("temp.png", draw_temp)
+    icons["humidity"] = create_icon("humidity.png", draw_humidity)
+    icons["wind"] = create_icon("wind.png", draw_wind)
+    icons["sky"] = create_icon("sky.png", draw_sky)
+    icons["high_temp"] = create_icon("high_temp.png", draw_high_temp)
+    icons["low_temp"] = create_icon("low_temp.png", draw_low_temp)
+    icons["hazard"] = create_icon("hazard.png", draw_hazard)
+    icons["pressure"] = create_icon("pressure.png", draw_pressure)
 
     # --- Moon Phase Icons ---
-    create_icon("moon_new.png", draw_new_moon)
-    create_icon("moon_waxing_crescent.png", draw_waxing_crescent)
-    create_icon("moon_first_quarter.png", draw_first_quarter)
-    create_icon("moon_waxing_gibbous.png", draw_waxing_gibbous)
-    create_icon("moon_full.png", draw_full_moon)
-    create_icon("moon_waning_gibbous.png", draw_waning_gibbous)
-    create_icon("moon_third_quarter.png", draw_third_quarter)
-    create_icon("moon_waning_crescent.png", draw_waning_crescent)
+    icons["moon_new"] = create_icon("moon_new.png", draw_new_moon)
+    icons["moon_waxing_crescent"] = create_icon("moon_waxing_crescent.png", draw_waxing_crescent)
+    icons["moon_first_quarter"] = create_icon("moon_first_quarter.png", draw_first_quarter)
+    icons["moon_waxing_gibbous"] = create_icon("moon_waxing_gibbous.png", draw_waxing_gibbous)
+    icons["moon_full"] = create_icon("moon_full.png", draw_full_moon)
+    icons["moon_waning_gibbous"] = create_icon("moon_waning_gibbous.png", draw_waning_gibbous)
+    icons["moon_third_quarter"] = create_icon("moon_third_quarter.png", draw_third_quarter)
+    icons["moon_waning_crescent"] = create_icon("moon_waning_crescent.png", draw_waning_crescent)
+
+    create_atlas(icons)
 
 if __name__ == "__main__":
     main()
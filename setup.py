@@ -9,14 +9,20 @@ setup(
         "Pillow",
         "RPi.GPIO",
     ],
+    extras_require={
+        # Incremental gridpoint parsing and brotli-compressed responses.
+        'fast': ["ijson", "brotli"],
+    },
     include_package_data=True,
     package_data={
-        'weather': ['icons/*.png'],
+        'weather': ['icons/*.png', 'icons/*.json'],
     },
     entry_points={
         'console_scripts': [
             'weather-gui = weather.gui:main',
             'weather-leds = weather.leds:main',
+            'weather-broker = weather.broker:main',
+            'weather-batch = weather.batch:main',
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""Fast path for NWS watches, warnings and advisories.
+
+The gridpoint "hazards" layer only arrives with the full forecastGridData
+download, every 10-30 minutes. /alerts/active?point=lat,lon is a few KB
+(an empty FeatureCollection most of the time), so AlertPoller polls it
+every POLL_INTERVAL seconds on its own, with If-None-Match /
+If-Modified-Since so that an unchanged answer is a bodiless 304. Alerts
+are deduplicated by ID, and messages that a newer one in the same response
+updates or cancels (its "references") are dropped, so consumers only hear
+about a change when the set of active alerts really changes.
+
+The broker polls on behalf of its subscribers (topic "alerts"); without a
+broker the GUI and the LED script each run watch() on a thread.
+"""
+import time
+from datetime import datetime
+
+from . import metrics, nws
+
+# --- Configuration ---
+HEADERS = {'User-Agent': 'MyWeatherGUI/1.0 (myemail@example.com)'}
+POLL_INTERVAL = 60   # seconds between polls
+ALERT_TIMEOUT = 10   # seconds per poll
+ALERTS_URL = f"{nws.API_BASE}/alerts/active?point={{lat:.4f}},{{lon:.4f}}"
+URGENT_SEVERITIES = ("Extreme", "Severe")  # alerts that make the LEDs flash
+SEVERITY_ORDER = {"Extreme": 0, "Severe": 1, "Moderate": 2, "Minor": 3}
+
+
+def _epoch(timestamp):
+    return datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+
+
+def parse(document, now=None):
+    """Compact, deduplicated active alerts from an /alerts GeoJSON document.
+
+    Returns a list of {"id", "event", "headline", "severity", "ends"} dicts
+    ("ends" is an epoch or None), most severe first. Test and exercise
+    messages, cancellations, expired alerts and alerts superseded by
+    another message in the same document are left out.
+    """
+    now = time.time() if now is None else now
+    properties = [feature.get("properties", {}) for feature in document.get("features", [])]
+    superseded = {ref.get("identifier") for p in properties for ref in p.get("references", [])}
+    alerts = {}
+    for p in properties:
+        alert_id = p.get("id")
+        if not alert_id or alert_id in alerts or alert_id in superseded:
+            continue
+        if p.get("status", "Actual") != "Actual" or p.get("messageType") == "Cancel":
+            continue
+        ends = _epoch(p.get("ends") or p.get("expires"))
+        if ends is not None and ends <= now:
+            continue
+        alerts[alert_id] = {
+            "id": alert_id,
+            "event": p.get("event", "Alert"),
+            "headline": p.get("headline"),
+            "severity": p.get("severity", "Unknown"),
+            "ends": ends,
+        }
+    return sorted(alerts.values(), key=lambda a: (SEVERITY_ORDER.get(a["severity"], 4), a["event"], a["id"]))
+
+
+def describe(alert):
+    """One line for a display, e.g. "Winter Storm Warning until Sat 18:00"."""
+    if alert["ends"] is None:
+        return alert["event"]
+    return f"{alert['event']} until {time.strftime('%a %H:%M', time.localtime(alert['ends']))}"
+
+
+def is_urgent(alerts):
+    return any(alert["severity"] in URGENT_SEVERITIES for alert in alerts)
+
+
+class AlertPoller:
+    """Conditional polling of the active alerts for one point."""
+
+    def __init__(self, lat, lon, headers=HEADERS):
+        self.url = ALERTS_URL.format(lat=lat, lon=lon)
+        self.headers = headers
+        self.etag = None
+        self.last_modified = None
+        self.alerts = None  # parse() result of the last successful poll
+
+    def poll(self):
+        """Fetch once. Returns True when the set of active alerts changed; raises on failure."""
+        headers = dict(self.headers)
+        if self.etag: headers["If-None-Match"] = self.etag
+        if self.last_modified: headers["If-Modified-Since"] = self.last_modified
+        response = nws.fetch(self.url, headers=headers, timeout=ALERT_TIMEOUT)
+        if response.status_code == 304 and self.alerts is not None:
+            alerts = [a for a in self.alerts if a["ends"] is None or a["ends"] > time.time()]
+        else:
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            with metrics.timed("json_parse"):
+                document = response.json()
+            alerts = parse(document)
+        changed = alerts != self.alerts
+        self.alerts = alerts
+        return changed
+
+
+def watch(poller, on_change, interval=POLL_INTERVAL, stop=None):
+    """Poll until `stop` (a threading.Event) is set, calling on_change(alerts) on every change.
+
+    Meant for a daemon thread. Failed polls are logged and retried at the
+    next interval; the last known alerts stay in effect meanwhile.
+    """
+    while stop is None or not stop.is_set():
+        try:
+            if poller.poll():
+                on_change(poller.alerts)
+        except Exception as e:
+            print(f"--- Debug: Alert poll failed: {e}")
+        if stop is None:
+            time.sleep(interval)
+        else:
+            stop.wait(interval)
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+"""Forecast summaries for many locations, fetched once per distinct NWS grid cell.
+
+Nearby sites usually resolve to the same forecast office and 2.5 km grid
+cell, and therefore to the same forecastHourly, forecast and
+forecastGridData URLs. get_batch_weather_data() resolves every location
+to its grid (through the /points disk cache), downloads each distinct URL
+once, concurrently under one global rate limit, and then builds a
+report.summarize() dict per location from the shared documents. Cost
+scales with the number of grid cells, not the number of sites.
+"""
+import argparse
+import json
+import sys
+import time
+from functools import partial
+
+from . import cache, metrics, nws, radar, report
+
+# --- Configuration ---
+RATE_LIMIT = 5         # requests per second across the whole batch
+RATE_BURST = 5
+BATCH_DEADLINE = 120   # seconds for resolving and fetching the whole batch
+GRID_LAYERS = report.GRID_LAYERS + ('hazards',)
+PRODUCT_URLS = {"hourly": "forecastHourly", "forecast": "forecast", "grid": "forecastGridData"}
+
+
+def get_batch_weather_data(locations, headers=report.HEADERS, rate=RATE_LIMIT, deadline=BATCH_DEADLINE, stats=None):
+    """Summarise current conditions for each (lat, lon) in `locations`.
+
+    Returns a dict mapping each (lat, lon) to a report.summarize() dict, or
+    to the exception that prevented it. If `stats` is a dict it is filled
+    with locations, grid_cells, requests and seconds.
+    """
+    start = time.monotonic()
+    limiter = nws.RateLimiter(rate, RATE_BURST)
+    locations = list(dict.fromkeys(locations))
+
+    # Stage 1: resolve each distinct /points key; cached entries cost nothing.
+    points, point_calls = {}, {}
+    for lat, lon in locations:
+        key = cache.points_key(lat, lon)
+        if key in points or key in point_calls:
+            continue
+        properties = cache.get(key, cache.POINTS_TTL)
+        if properties is not None:
+            points[key] = properties
+        else:
+            point_calls[key] = limiter.limit(partial(nws.get_point_properties, lat, lon, headers))
+    station_index = radar.get_station_index()
+    if station_index is None:
+        point_calls["stations"] = limiter.limit(partial(nws.fetch_json, nws.RADAR_STATIONS_URL, headers, nws.DEFAULT_TIMEOUT))
+    if point_calls:
+        points.update(nws.run_concurrently(point_calls, deadline))
+    if station_index is None:
+        stations = points.pop("stations")
+        try:
+            if isinstance(stations, Exception): raise stations
+            station_index = radar.store_station_index(stations)
+        except Exception as e:
+            print(f"--- Debug: Could not locate radar stations: {e}", file=sys.stderr)
+
+    # Stage 2: fetch every distinct product URL once.
+    fetches = {}
+    for properties in points.values():
+        if isinstance(properties, Exception):
+            continue
+        for product, field in PRODUCT_URLS.items():
+            url = properties[field]
+            if url not in fetches:
+                if product == "grid":
+                    fetches[url] = limiter.limit(partial(nws.fetch_grid_layers, url, GRID_LAYERS, headers, nws.DEFAULT_TIMEOUT))
+                else:
+                    fetches[url] = limiter.limit(partial(nws.fetch_json, url, headers, nws.DEFAULT_TIMEOUT))
+    remaining = max(0, deadline - (time.monotonic() - start))
+    documents = nws.run_concurrently(fetches, remaining) if fetches else {}
+
+    # Stage 3: summarise per location from the shared documents.
+    now = time.time()
+    results = {}
+    for lat, lon in locations:
+        properties = points[cache.points_key(lat, lon)]
+        try:
+            if isinstance(properties, Exception): raise properties
+            docs = {product: documents[properties[field]] for product, field in PRODUCT_URLS.items()}
+            for doc in docs.values():
+                if isinstance(doc, Exception): raise doc
+            radar_image_urls, radar_loop_urls = [], []
+            if station_index is not None:
+                radar_image_urls = radar.image_urls(station_index, lat, lon)
+                radar_loop_urls = radar.image_urls(station_index, lat, lon, template=radar.RADAR_LOOP_URL)
+            results[(lat, lon)] = report.summarize(docs["hourly"], docs["forecast"], docs["grid"], radar_image_urls, radar_loop_urls, now)
+        except Exception as e:
+            results[(lat, lon)] = e
+
+    if stats is not None:
+        stats.update({
+            "locations": len(locations),
+            "grid_cells": len({properties["forecastGridData"] for properties in points.values() if not isinstance(properties, Exception)}),
+            "requests": len(point_calls) + len(fetches),
+            "seconds": time.monotonic() - start,
+        })
+    return results
+
+
+def load_locations(lines):
+    """Parse "lat,lon[,name]" lines (blank lines and #-comments ignored) into (name, lat, lon) tuples.
+
+    Raises ValueError naming the line number of the first malformed line.
+    """
+    locations = []
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            lat, lon, *name = (part.strip() for part in line.split(","))
+            locations.append((name[0] if name else f"{lat},{lon}", float(lat), float(lon)))
+        except ValueError:
+            raise ValueError(f'line {number}: expected "lat,lon[,name]", got {line!r}') from None
+    return locations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print current conditions for many locations as JSON lines.")
+    parser.add_argument('file', help='File of "lat,lon[,name]" lines, or - for stdin.')
+    parser.add_argument('-r', '--rate', type=float, default=RATE_LIMIT, help=f'Maximum NWS requests per second (default: {RATE_LIMIT}).')
+    args = parser.parse_args()
+
+    try:
+        if args.file == "-":
+            locations = load_locations(sys.stdin)
+        else:
+            with open(args.file) as f:
+                locations = load_locations(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.file}: {e}")
+
+    metrics.start("batch")
+    stats = {}
+    try:
+        with metrics.timed("batch"):
+            results = get_batch_weather_data([(lat, lon) for _, lat, lon in locations], rate=args.rate, stats=stats)
+    finally:
+        nws.close()
+        metrics.export()
+    failed = 0
+    for name, lat, lon in locations:
+        result = results[(lat, lon)]
+        line = {"name": name, "lat": lat, "lon": lon}
+        if isinstance(result, Exception):
+            line["error"] = str(result) or type(result).__name__
+            failed += 1
+        else:
+            line["weather"] = result
+        print(json.dumps(line))
+    print(f"{stats['locations']} locations in {stats['grid_cells']} grid cells: "
+          f"{stats['requests']} requests in {stats['seconds']:.1f}s, {failed} failed", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/python3
+"""Local weather broker: one process per host fetches from NWS for everyone.
+
+`weather-broker` owns all NWS polling for config.LATITUDE/LONGITUDE and
+publishes the results over a Unix domain socket. weather-gui and
+weather-leds subscribe when a broker is running and fall back to fetching
+for themselves when it isn't, so several displays on one Pi cost no more
+upstream traffic than one.
+
+The protocol is newline-delimited JSON. A client sends
+{"subscribe": [topic, ...]} and receives the latest message for each topic
+straight away, then a new one whenever that topic's value changes:
+{"topic": ..., "fetched": epoch, "value": ...}. A value of null means the
+last fetch failed and subscribers should treat what they have as stale.
+{"refresh": true} asks the broker to refetch now.
+
+Topics:
+    report    the GUI summary from report.get_weather_data()
+    schedule  the LED schedule from leds.get_weather_data()
+    alerts    active NWS alerts from alerts.AlertPoller, polled every
+              alerts.POLL_INTERVAL seconds independently of the forecast
+"""
+import argparse
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+
+from . import alerts, cache, metrics, nws, report
+from .config import LATITUDE, LONGITUDE
+
+# --- Configuration ---
+SOCKET_PATH = os.environ.get("WEATHER_BROKER_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or cache.CACHE_DIR, "weather-broker.sock"
+)
+TOPICS = ("report", "schedule", "alerts")
+RETRY_INTERVAL = 300
+MAX_PENDING = 1 << 20  # bytes queued for a subscriber that stopped reading before it is dropped
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class Broker:
+    """Select loop serving subscribers; fetches run on a worker thread.
+
+    The loop never blocks: client sockets are non-blocking with a
+    per-client output buffer that is written as the socket drains, and
+    every upstream fetch is handed to the worker, which posts the result
+    to `done` and wakes the loop through a socketpair.
+    """
+
+    def __init__(self, lat, lon, path=SOCKET_PATH):
+        self.lat = lat
+        self.lon = lon
+        self.path = path
+        self.latest = {}   # topic -> (value, encoded message)
+        self.clients = {}  # socket -> {"topics": set, "buffer": bytes read, "out": bytearray to write}
+        self.next_fetch = 0
+        self.force = False  # a subscriber asked for a refresh: refetch everything, due or not
+        self.alert_poller = alerts.AlertPoller(lat, lon)
+        self.next_alerts = 0
+        self.pending = set()       # jobs handed to the worker that haven't come back yet
+        self.jobs = queue.Queue()  # (job, args) for the worker; job None stops it
+        self.done = queue.Queue()  # (job, result) for the loop
+        self.wakeup = None         # (read end, write end) socketpair
+        self.worker = None
+        self.running = False
+        self.selector = None
+        self.listener = None
+
+    def produce(self, force=False):
+        """Fetch once and derive every topic; products shared by both are only downloaded once."""
+        from . import leds  # imported here: leds itself subscribes to the broker
+        return {
+            "report": report.get_weather_data(self.lat, self.lon, force=force),
+            "schedule": leds.get_weather_data(self.lat, self.lon),
+        }
+
+    # --- Worker thread ---
+
+    def work(self, wake):
+        while True:
+            job, args = self.jobs.get()
+            if job is None:
+                return
+            try:
+                result = getattr(self, job)(*args)
+            except Exception as e:
+                print(f"--- Debug: Broker {job} failed: {e}")
+                result = None
+            self.done.put((job, result))
+            try:
+                wake.send(b"\0")
+            except OSError:
+                pass  # the loop has shut down, or already has a wake-up pending
+
+    def refresh(self, force=False):
+        with metrics.timed("broker_refresh"):
+            return self.produce(force)
+
+    def poll_alerts(self):
+        try:
+            self.alert_poller.poll()
+        except Exception as e:
+            print(f"--- Debug: Alert poll failed: {e}")  # subscribers keep the last alerts
+            return None
+        return self.alert_poller.alerts
+
+    # --- Select loop ---
+
+    def submit(self, job, *args):
+        self.pending.add(job)
+        self.jobs.put((job, args))
+
+    def collect(self):
+        """Handle whatever the worker has finished."""
+        try:
+            while self.wakeup[0].recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                job, result = self.done.get_nowait()
+            except queue.Empty:
+                return
+            self.pending.discard(job)
+            getattr(self, f"{job}_done")(result)
+
+    def refresh_done(self, values):
+        now = time.time()
+        if values is not None:
+            for topic, value in values.items():
+                self.update(topic, value, now)
+        if values is not None and all(value is not None for value in values.values()):
+            due = report.refresh_schedule.next_due() or now + report.DEFAULT_REFRESH_INTERVAL
+            self.next_fetch = max(due, now + report.MIN_REFRESH_INTERVAL)
+        else:
+            self.next_fetch = now + RETRY_INTERVAL
+        if self.force:
+            self.next_fetch = 0  # a subscriber asked for a refresh while this one was running
+        metrics.export()
+
+    def poll_alerts_done(self, value):
+        if value is not None:
+            self.update("alerts", value, time.time())
+        self.next_alerts = time.time() + alerts.POLL_INTERVAL
+
+    def update(self, topic, value, fetched):
+        """Publish `value` on `topic` unless it is what subscribers already have."""
+        previous = self.latest.get(topic)
+        if previous is not None and previous[0] == value:
+            return
+        message = _encode({"topic": topic, "fetched": fetched, "value": value})
+        self.latest[topic] = (value, message)
+        self.publish(topic, message)
+
+    def publish(self, topic, message):
+        for sock, client in list(self.clients.items()):
+            if topic in client["topics"]:
+                self.send(sock, message)
+
+    def send(self, sock, message):
+        client = self.clients.get(sock)
+        if client is None:
+            return
+        client["out"] += message
+        if len(client["out"]) > MAX_PENDING:
+            print("--- Debug: Dropping a subscriber that stopped reading")
+            self.drop(sock)
+            return
+        self.flush(sock)
+
+    def flush(self, sock):
+        """Write as much of the client's output buffer as the socket takes; watch for writability while any is left."""
+        client = self.clients[sock]
+        try:
+            sent = sock.send(client["out"])
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self.drop(sock)
+            return
+        del client["out"][:sent]
+        writing = bool(client["out"])
+        if writing != client["writing"]:
+            client["writing"] = writing
+            self.selector.modify(sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0))
+
+    def drop(self, sock):
+        if self.clients.pop(sock, None) is not None:
+            self.selector.unregister(sock)
+        sock.close()
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        self.clients[sock] = {"topics": set(), "buffer": b"", "out": bytearray(), "writing": False}
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def read(self, sock):
+        try:
+            data = sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(sock)
+            return
+        client = self.clients[sock]
+        client["buffer"] += data
+        while b"\n" in client["buffer"]:
+            line, client["buffer"] = client["buffer"].split(b"\n", 1)
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            for topic in request.get("subscribe", []):
+                client["topics"].add(topic)
+                if topic in self.latest:
+                    self.send(sock, self.latest[topic][1])
+                if sock not in self.clients:
+                    return
+            if request.get("refresh"):
+                self.next_fetch = 0
+                self.force = True
+
+    def bind(self):
+        if os.path.exists(self.path):
+            probe = Subscriber(())
+            listening = probe.connect(self.path)
+            probe.close()
+            if listening:
+                raise RuntimeError(f"A weather broker is already listening on {self.path}")
+            os.remove(self.path)  # stale socket from a broker that didn't shut down cleanly
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, 0o666)  # the GUI and the LED script may run as different users
+        self.listener.listen()
+        self.listener.setblocking(False)
+
+    def serve_forever(self):
+        self.bind()
+        self.wakeup = socket.socketpair()
+        for sock in self.wakeup:
+            sock.setblocking(False)
+        self.worker = threading.Thread(target=self.work, args=(self.wakeup[1],), daemon=True)
+        self.worker.start()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.selector.register(self.wakeup[0], selectors.EVENT_READ)
+        self.running = True
+        try:
+            while self.running:
+                if time.time() >= self.next_alerts and "poll_alerts" not in self.pending:
+                    self.submit("poll_alerts")
+                if time.time() >= self.next_fetch and "refresh" not in self.pending:
+                    force, self.force = self.force, False
+                    self.submit("refresh", force)
+                deadlines = [due for job, due in (("poll_alerts", self.next_alerts), ("refresh", self.next_fetch))
+                             if job not in self.pending]
+                timeout = max(0, min(deadlines) - time.time()) if deadlines else None
+                for key, events in self.selector.select(timeout):
+                    sock = key.fileobj
+                    if sock is self.listener:
+                        self.accept()
+                    elif sock is self.wakeup[0]:
+                        self.collect()
+                    else:
+                        if events & selectors.EVENT_READ and sock in self.clients:
+                            self.read(sock)
+                        if events & selectors.EVENT_WRITE and sock in self.clients:
+                            self.flush(sock)
+        finally:
+            self.close()
+
+    def close(self):
+        self.running = False
+        for sock in list(self.clients):
+            self.drop(sock)
+        if self.worker is not None:
+            self.jobs.put((None, ()))  # a fetch in progress is abandoned with the daemon thread
+            self.worker = None
+        if self.wakeup is not None:
+            for sock in self.wakeup:
+                sock.close()
+            self.wakeup = None
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class Subscriber:
+    """Client side of the broker protocol."""
+
+    def __init__(self, topics):
+        self.topics = list(topics)
+        self.sock = None
+        self.buffer = b""
+
+    def connect(self, path=SOCKET_PATH):
+        """Connect and subscribe; returns False if no broker is listening."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            sock.sendall(_encode({"subscribe": self.topics}))
+        except OSError:
+            sock.close()
+            return False
+        self.sock = sock
+        return True
+
+    def receive(self, timeout=None):
+        """Return the next message dict, or None if `timeout` seconds pass first.
+
+        Raises ConnectionError when the broker goes away.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while b"\n" not in self.buffer:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None  # settimeout(0) would make recv() raise BlockingIOError instead
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(65536)
+            except (socket.timeout, BlockingIOError):
+                return None
+            if not data:
+                raise ConnectionError("weather broker closed the connection")
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def request_refresh(self):
+        try:
+            self.sock.sendall(_encode({"refresh": True}))
+        except OSError:
+            pass  # receive() reports the lost connection
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def connect(topics, path=SOCKET_PATH):
+    """Return a Subscriber for `topics` if a broker is running, else None."""
+    subscriber = Subscriber(topics)
+    return subscriber if subscriber.connect(path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch NWS data once per host and publish it to local weather displays.")
+    parser.add_argument('--socket', default=SOCKET_PATH, help=f'Unix socket to listen on (default: {SOCKET_PATH}).')
+    args = parser.parse_args()
+
+    metrics.start("broker")
+    broker = Broker(LATITUDE, LONGITUDE, args.socket)
+
+    def stop(signum, frame):
+        broker.close()
+        nws.close()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Weather broker listening on {args.socket}")
+    broker.serve_forever()
+
+if __name__ == "__main__":
+    main()
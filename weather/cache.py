@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""Small persistent JSON cache for slow-changing NWS lookups and snapshots.
+
+Entries are stored one file per key under CACHE_DIR together with the time
+they were written, so they survive restarts. Reads older than the caller's
+TTL, unreadable files and explicitly invalidated keys are all treated as
+misses.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+
+# --- Configuration ---
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "weather-suite"
+)
+POINTS_TTL = 7 * 24 * 3600    # grid assignments change only when NWS re-grids an office
+STATIONS_TTL = 7 * 24 * 3600  # radar sites are effectively static
+SNAPSHOT_MAX_AGE = 24 * 3600  # last-known-good results older than this are not shown at startup
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".json")
+
+
+def get_entry(key, ttl):
+    """Return (value, stored_epoch) for `key` if younger than `ttl` seconds, else (None, None)."""
+    try:
+        with open(_path(key)) as f:
+            entry = json.load(f)
+        if time.time() - entry["stored"] <= ttl:
+            return entry["value"], entry["stored"]
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError):
+        invalidate(key)  # corrupt entry; drop it so the next write starts clean
+    return None, None
+
+
+def get(key, ttl):
+    """Return the cached value for `key` if it is younger than `ttl` seconds, else None."""
+    return get_entry(key, ttl)[0]
+
+
+def put(key, value):
+    """Store `value` (anything JSON-serialisable) under `key`, atomically."""
+    try:
+        os.makedirs(CACHE_DIR, mode=0o755, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"stored": time.time(), "value": value}, f, separators=(",", ":"))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, _path(key))
+    except OSError as e:
+        print(f"Warning: could not write cache entry '{key}': {e}")
+
+
+def invalidate(key):
+    """Forget the cached value for `key`, if any."""
+    try:
+        os.remove(_path(key))
+    except OSError:
+        pass
+
+
+def points_key(lat, lon):
+    return f"points_{lat:.4f}_{lon:.4f}"
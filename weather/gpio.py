@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""GPIO backends for weather-leds.
+
+load() returns either the real RPi.GPIO module or a SimulatedGPIO, which has
+the same interface for the calls this package makes and records every pin
+transition with a monotonic timestamp. The simulator lets the LED code run,
+and be profiled, on any Linux box.
+"""
+import os
+import time
+from collections import deque
+
+TRACE_LIMIT = 100000  # transitions kept by the simulator
+
+
+class SimulatedGPIO:
+    """In-process stand-in for RPi.GPIO that keeps a timing trace."""
+
+    BCM = "BCM"
+    BOARD = "BOARD"
+    OUT = "OUT"
+    IN = "IN"
+    HIGH = 1
+    LOW = 0
+
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.mode = None
+        self.pins = {}  # pin -> current level
+        self.trace = deque(maxlen=TRACE_LIMIT)  # (monotonic time, pin, level)
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction):
+        self.pins.setdefault(pin, self.LOW)
+
+    def output(self, pin, value):
+        level = self.HIGH if value else self.LOW
+        self.trace.append((time.monotonic(), pin, level))
+        self.pins[pin] = level
+        if self.echo:
+            print(f"GPIO {pin} -> {'HIGH' if level else 'LOW'}")
+
+    def input(self, pin):
+        return self.pins.get(pin, self.LOW)
+
+    def cleanup(self):
+        for pin in self.pins:
+            self.pins[pin] = self.LOW
+
+    def transitions(self, pin):
+        """Timestamps and levels recorded for one pin, oldest first."""
+        return [(t, level) for t, p, level in self.trace if p == pin]
+
+
+def load(simulate=False):
+    """Return the GPIO backend: RPi.GPIO, or the simulator when asked for.
+
+    The simulator is also chosen when WEATHER_GPIO=sim is set in the environment.
+    """
+    if simulate or os.environ.get("WEATHER_GPIO") == "sim":
+        return SimulatedGPIO(echo=os.environ.get("WEATHER_GPIO_ECHO") == "1")
+    import RPi.GPIO
+    return RPi.GPIO
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""Array-backed time series for NWS gridpoint layers.
+
+A forecastGridData layer is a list of {"validTime": "<start>/<ISO duration>",
+"value": x} entries. GridData parses every numeric layer once into compact
+float arrays (start epoch, duration in seconds, value) so that "what is the
+value at time t" is a bisect instead of a walk over the raw JSON.
+"""
+import math
+import re
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+_DURATION_RE = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def parse_valid_time(valid_time):
+    """Split an ISO-8601 "start/duration" interval into (start_epoch, duration_seconds)."""
+    start, _, duration = valid_time.partition("/")
+    match = _DURATION_RE.match(duration)
+    if not match:
+        raise ValueError(f"Unsupported ISO-8601 duration: {duration!r}")
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return (
+        datetime.fromisoformat(start).timestamp(),
+        days * 86400 + hours * 3600 + minutes * 60 + seconds,
+    )
+
+
+def convert(values, factor=1.0, offset=0.0):
+    """Map every value to value * factor + offset in one pass, into a new float array."""
+    return array("d", [v * factor + offset for v in values])
+
+
+class GridSeries:
+    """One gridpoint layer: parallel arrays of start epochs, durations and values."""
+
+    __slots__ = ("starts", "durations", "values", "uom")
+
+    def __init__(self, starts, durations, values, uom=None):
+        self.starts = starts
+        self.durations = durations
+        self.values = values  # missing values are stored as NaN
+        self.uom = uom
+
+    @classmethod
+    def from_layer(cls, layer):
+        starts, durations, values = array("d"), array("d"), array("d")
+        for entry in layer.get("values", []):
+            start, duration = parse_valid_time(entry["validTime"])
+            value = entry.get("value")
+            starts.append(start)
+            durations.append(duration)
+            values.append(math.nan if value is None else float(value))
+        return cls(starts, durations, values, layer.get("uom"))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def index_at(self, t):
+        """Index of the interval in effect at `t`, else of the next one to start, else None."""
+        i = bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.starts[i] + self.durations[i]:
+            return i
+        return i + 1 if i + 1 < len(self.starts) else None
+
+    def value_at(self, t, default=None):
+        i = self.index_at(t)
+        if i is None or math.isnan(self.values[i]):
+            return default
+        return self.values[i]
+
+    def converted(self, factor=1.0, offset=0.0, uom=None):
+        """Return a new series with every value mapped to value * factor + offset."""
+        return GridSeries(self.starts, self.durations, convert(self.values, factor, offset), uom or self.uom)
+
+
+class GridData:
+    """All numeric layers of a forecastGridData "properties" object, parsed once."""
+
+    def __init__(self, properties, names=None):
+        # `names` restricts parsing to the layers a caller actually reads.
+        self.layers = {}
+        for name, layer in properties.items():
+            if names is not None and name not in names:
+                continue
+            if not isinstance(layer, dict) or "values" not in layer:
+                continue
+            try:
+                self.layers[name] = GridSeries.from_layer(layer)
+            except (TypeError, ValueError, KeyError):
+                pass  # non-numeric layers such as hazards or weather
+
+    def layer(self, name):
+        return self.layers.get(name)
+
+    def value_at(self, name, t=None, default=0.0, factor=1.0, offset=0.0):
+        """Value of layer `name` at epoch `t` (default now), converted with factor/offset."""
+        series = self.layers.get(name)
+        if series is None:
+            return default
+        value = series.value_at(time.time() if t is None else t)
+        return default if value is None else value * factor + offset
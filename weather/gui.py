@@ -1,20 +1,36 @@
 #!/usr/bin/python3
-import requests
+# requests and Pillow are imported on first use (see weather/nws.py, weather/radar.py and
+# the WeatherApp methods) so that importing this module stays fast on a Pi.
+import json
 import sys
 import textwrap
 import tkinter as tk
 from tkinter import font
-from PIL import Image, ImageTk
 import os
+import queue
+import threading
 import time
+from collections import deque
 from datetime import datetime
-import io
+from functools import partial
 from .config import LATITUDE, LONGITUDE
+from . import alerts, cache, history, metrics, nws, radar, report, strip
+from .report import get_weather_data, refresh_schedule
+from .strip import ForecastStrip
 from importlib import resources
 
 # --- Configuration ---
-UPDATE_INTERVAL = 600000  # 10 minutes in milliseconds
+UPDATE_INTERVAL = report.DEFAULT_REFRESH_INTERVAL * 1000  # ms; also the radar refresh interval under the broker
 RADAR_IMAGE_WIDTH = 500
+ICON_SIZE = 20  # must be one of generate_icons.ATLAS_SIZES
+POLL_INTERVAL = 200  # ms between checks for a finished background refresh
+RADAR_FRAME_DELAY = 250  # ms per radar loop frame
+RADAR_LOOP_PAUSE = 1500  # ms to hold the newest frame before the loop restarts
+SNAPSHOT_KEY = "snapshot_gui"
+DEBUG_OVERLAY = os.environ.get("WEATHER_DEBUG_OVERLAY") == "1"  # F3 toggles it at runtime
+HISTORY_WIDTH, HISTORY_HEIGHT = 192, 24  # px; the 24 h temperature sparkline
+TENDENCY_ARROWS = {"rising": " ↑", "falling": " ↓", "steady": " →"}
+OVERLAY_STAGES = (("fetch", "refresh"), ("grid", "grid_series"), ("radar", "radar_decode"), ("render", "render"))
 
 # --- Color Palette ---
 COLOR_BG = "#2E3440"
@@ -37,114 +53,124 @@ def get_moon_phase():
     if phase_decimal < 0.78: return "Third Quarter", "moon_third_quarter.png"
     return "Waning Crescent", "moon_waning_crescent.png"
 
-def get_weather_data(lat, lon):
-    try:
-        headers = {'User-Agent': 'MyWeatherGUI/1.0 (myemail@example.com)'}
-        points_url = f"https://api.weather.gov/points/{lat},{lon}"
-        points_res = requests.get(points_url, headers=headers, timeout=15)
-        points_res.raise_for_status()
-        properties = points_res.json()['properties']
-        
-        hourly_url = properties['forecastHourly']
-        grid_data_url = properties['forecastGridData']
-        forecast_url = properties['forecast']
-
-        hourly_res = requests.get(hourly_url, headers=headers, timeout=15)
-        hourly_res.raise_for_status()
-        current_period = hourly_res.json()['properties']['periods'][0]
-        
-        forecast_res = requests.get(forecast_url, headers=headers, timeout=15)
-        forecast_res.raise_for_status()
-        detailed_forecast = forecast_res.json()['properties']['periods'][0]['detailedForecast']
+def section_note(data):
+    """Footer suffix naming the sections that are stale or missing, e.g. " (grid stale)"."""
+    problems = [f"{name} {'stale' if status['state'] == 'stale' else 'unavailable'}"
+                for name, status in data.get('sections', {}).items() if status['state'] != "ok"]
+    return f" ({', '.join(problems)})" if problems else ""
 
-        grid_res = requests.get(grid_data_url, headers=headers, timeout=15)
-        grid_res.raise_for_status()
-        grid_props = grid_res.json()['properties']
-        
-        def get_grid_value(prop, default=0.0, factor=1.0, offset=0.0):
-            try:
-                prop_data = grid_props.get(prop, {})
-                values_list = prop_data.get('values', [])
-                val = values_list[0].get('value') if values_list else None
-                return (val * factor) + offset if val is not None else default
-            except Exception as e:
-                print(f"--- Debug: Error in get_grid_value for prop '{prop}': {e}")
-                return default
-
-        radar_image_url = None
-        try:
-            stations_res = requests.get("https://api.weather.gov/radar/stations", headers=headers, timeout=15)
-            stations_res.raise_for_status()
-            stations = stations_res.json()['features']
-            
-            closest_station = min(stations, key=lambda s: ((s['geometry']['coordinates'][1] - lat)**2 + (s['geometry']['coordinates'][0] - lon)**2))
-            if closest_station:
-                station_id = closest_station['properties']['id']
-                radar_image_url = f"https://radar.weather.gov/ridge/standard/{station_id}_0.gif"
-        except Exception:
-            pass
+def reading(value, spec=".1f"):
+    """Format a summary value, or "--" when the forecast doesn't provide it."""
+    return "--" if value is None else format(value, spec)
 
-        return {
-            "radar_image_url": radar_image_url,
-            "current_temp": current_period['temperature'],
-            "short_forecast": current_period['shortForecast'],
-            "detailed_forecast": detailed_forecast,
-            "dewpoint_f": get_grid_value('dewpoint', factor=1.8, offset=32),
-            "humidity": get_grid_value('relativeHumidity'),
-            "sky_cover": get_grid_value('skyCover'),
-            "wind_speed_mph": get_grid_value('windSpeed', factor=0.621371),
-            "wind_direction": get_grid_value('windDirection'),
-            "wind_gust_mph": get_grid_value('windGust', factor=0.621371),
-            "max_temp": get_grid_value('maxTemperature', factor=1.8, offset=32),
-            "min_temp": get_grid_value('minTemperature', factor=1.8, offset=32),
-            "apparent_temp": get_grid_value('apparentTemperature', factor=1.8, offset=32),
-            "pressure_in": get_grid_value('surfacePressure', factor=0.02953),
-            "prob_precip": get_grid_value('probabilityOfPrecipitation'),
-            "hazards": [f"{item.get('phenomenon', '')} {item.get('significance', '')}".strip() for sub in grid_props.get('hazards', {}).get('values', []) for item in sub.get('value', [])]
-        }
-    except Exception as e:
-        print(f"--- Debug: CRITICAL ERROR in get_weather_data: {e}") # Keep this debug for now
-        return None
+def view_model(data, active_alerts=None):
+    """The text each `<key>_var` should show for `data`. Sections missing from `data` are left out,
+    so their widgets keep what they showed last; "pressure" is None when the row should be hidden.
+    Once the alerts feed has answered, `active_alerts` replaces the gridpoint hazards."""
+    view = {}
+    if 'current_temp' in data:  # hourly forecast
+        view['temp'] = f"Temp: {data['current_temp']}°F"
+        view['summary'] = f"Summary: {data['short_forecast']}"
+    if 'dewpoint_f' in data:  # gridpoint layers
+        view['feels'] = f"Feels Like: {reading(data['apparent_temp'])}°F"
+        view['humidity'] = f"Humidity: {reading(data['humidity'])}%"
+        view['dewpoint'] = f"Dewpoint: {reading(data['dewpoint_f'])}°F"
+        view['wind'] = f"Wind: {reading(data['wind_speed_mph'])} mph from {reading(data['wind_direction'], '.0f')}°"
+        view['gust'] = f"Gusts: {reading(data['wind_gust_mph'])} mph"
+        view['sky'] = f"Sky Cover: {reading(data['sky_cover'])}%"
+        view['precip'] = f"Precip Chance: {reading(data['prob_precip'])}%"
+        arrow = TENDENCY_ARROWS.get(history.describe_tendency(data.get('pressure_tendency')), "")
+        view['pressure'] = f"Pressure: {data['pressure_in']:.2f} inHg{arrow}" if data['pressure_in'] and data['pressure_in'] > 0 else None
+        view['high_low'] = f"High: {reading(data['max_temp'])}°F   Low: {reading(data['min_temp'])}°F"
+        view['hazards'] = "\n".join(data['hazards'])
+    if 'detailed_forecast' in data:  # 7-day forecast
+        view['detail'] = data['detailed_forecast']
+    if active_alerts is not None:  # weather/alerts.py
+        view['hazards'] = "\n".join(alerts.describe(alert) for alert in active_alerts)
+    if 'temp_history' in data:  # weather/history.py
+        temps = [t for t in data['temp_history'] if t is not None]
+        view['history'] = f"Last 24 h: {min(temps):.0f}–{max(temps):.0f}°F" if temps else "Last 24 h: collecting..."
+    return view
 
 class WeatherApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Weather Report")
         self.configure(bg=COLOR_BG, padx=15, pady=15)
-        self.last_update_time = 0
+        self.next_update_time = 0
+        self.data_time = 0  # when the data on screen was fetched
         self.radar_image = None
+        self.radar_key = None
         self.radar_visible = True
+        self.radar_loop = False
+        self.radar_loop_key = None
+        self.radar_frames = deque(maxlen=radar.RADAR_LOOP_FRAMES)  # (digest, PhotoImage) ring
+        self.radar_frame_index = 0
+        self.animation_id = None
+        self.has_hazards = False
+        self.has_radar = False
+        self.view = {}  # what each widget shows now, so a refresh only touches what changed
+        self.layout = None  # visible optional sections, as last gridded
         self.after_id = None
+        self.fetch_in_progress = False
+        self.refetch = None  # force flag of a fetch queued behind the running one, or None
+        self.results = queue.Queue()
+        self.alert_results = queue.Queue()  # active alert lists, newest last
+        self.active_alerts = None  # None until the alerts feed first answers
+        self.broker_message = None  # latest "report" message from the broker; None until the first one
+        self.broker_messages = queue.Queue()  # "report" messages from the listener thread, newest last; None when the broker is lost
+        from . import broker
+        self.subscriber = broker.connect(("report", "alerts"))  # None when no weather-broker runs on this host
 
         self.bold_font = font.Font(family="Helvetica", size=12, weight="bold")
         self.normal_font = font.Font(family="Helvetica", size=11)
         self.small_font = font.Font(family="Helvetica", size=10)
         self.tiny_font = font.Font(family="Helvetica", size=8)
 
+        metrics.start("gui")
         self.load_icons()
         self.create_widgets()
+        self.bind("<F3>", lambda event: self.toggle_debug_overlay())
+        self.show_snapshot()
         self.update_weather()
         self.update_countdown()
+        self.poll_results()
+        if self.subscriber is not None:
+            threading.Thread(target=self.listen_to_broker, daemon=True).start()
+        else:
+            self.watch_alerts()
 
     def load_icons(self):
+        """Read the pre-rendered icon atlas; PhotoImages are cut from it on first use by icon()."""
+        from PIL import Image
         self.icons = {}
-        icon_files = {
-            "temp": "temp.png", "humidity": "humidity.png", "wind": "wind.png", 
-            "sky": "sky.png", "hazard": "hazard.png", "pressure": "pressure.png",
-            "moon_new": "moon_new.png", "moon_waxing_crescent": "moon_waxing_crescent.png",
-            "moon_first_quarter": "moon_first_quarter.png", "moon_waxing_gibbous": "moon_waxing_gibbous.png",
-            "moon_full": "moon_full.png", "moon_waning_gibbous": "moon_waning_gibbous.png",
-            "moon_third_quarter": "moon_third_quarter.png", "moon_waning_crescent": "moon_waning_crescent.png"
-        }
-        for name, filename in icon_files.items():
+        self.icon_atlas = None
+        self.icon_boxes = {}
+        try:
+            icons_dir = resources.files('weather.icons')
+            atlas = json.loads((icons_dir / "atlas.json").read_text())[str(ICON_SIZE)]
+            with resources.as_file(icons_dir / atlas["file"]) as path:
+                self.icon_atlas = Image.open(path)
+                self.icon_atlas.load()
+            self.icon_boxes = atlas["icons"]
+        except (FileNotFoundError, ModuleNotFoundError, KeyError, ValueError):
+            print("Warning: Icon atlas not found; falling back to individual icon files.")
+
+    def icon(self, name):
+        if name not in self.icons:
+            from PIL import Image, ImageTk
+            self.icons[name] = None
+            box = self.icon_boxes.get(name)
             try:
-                # Use the newer `files()` API for Python 3.9+
-                icon_path = resources.files('weather.icons') / filename
-                with resources.as_file(icon_path) as path:
-                    if os.path.exists(path):
-                        self.icons[name] = ImageTk.PhotoImage(Image.open(path).resize((20, 20), Image.LANCZOS))
+                if box:
+                    x, y, w, h = box
+                    self.icons[name] = ImageTk.PhotoImage(self.icon_atlas.crop((x, y, x + w, y + h)))
+                else:
+                    with resources.as_file(resources.files('weather.icons') / f"{name}.png") as path:
+                        self.icons[name] = ImageTk.PhotoImage(Image.open(path).resize((ICON_SIZE, ICON_SIZE), Image.LANCZOS))
             except (FileNotFoundError, ModuleNotFoundError):
-                print(f"Warning: Icon not found: {filename}")
+                print(f"Warning: Icon not found: {name}.png")
+        return self.icons[name]
 
     def create_widgets(self):
         tk.Label(self, text=f"Weather Report: {LATITUDE:.2f}, {LONGITUDE:.2f}", font=self.bold_font, bg=COLOR_BG, fg=COLOR_HEADER).grid(row=0, column=0, columnspan=2, pady=(0, 10))
@@ -160,6 +186,13 @@ class WeatherApp(tk.Tk):
         self.create_icon_label(cond_frame, "sky", 4, "Sky Cover: ...")
         self.precip_var = self.create_info_label(cond_frame, 4, 2, "Precip Chance: ...")
         self.pressure_frame = self.create_icon_label(cond_frame, "pressure", 5, "Pressure: ...") # Added pressure icon label
+        history_frame = tk.Frame(cond_frame, bg=COLOR_BG)
+        history_frame.grid(row=6, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        self.history_var = tk.StringVar(value="Last 24 h: ...")
+        tk.Label(history_frame, textvariable=self.history_var, font=self.small_font, bg=COLOR_BG, fg=COLOR_FG).pack(side="left")
+        self.history_canvas = tk.Canvas(history_frame, width=HISTORY_WIDTH, height=HISTORY_HEIGHT, bg=COLOR_BG, highlightthickness=0)
+        self.history_canvas.pack(side="left", padx=10)
+        self.history_line = self.history_canvas.create_line(0, 0, 0, 0, fill=strip.COLOR_TEMP, width=2, state="hidden")
         self.fore_frame = tk.Frame(self, bg=COLOR_BG, bd=1, relief="solid", padx=10, pady=10)
         self.fore_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=10)
         tk.Label(self.fore_frame, text="Forecast", font=self.bold_font, bg=COLOR_BG, fg=COLOR_FG).grid(row=0, column=0, sticky="w")
@@ -177,10 +210,11 @@ class WeatherApp(tk.Tk):
 
         self.detail_var = tk.StringVar(value="...")
         tk.Label(self.fore_frame, textvariable=self.detail_var, font=self.small_font, bg=COLOR_BG, fg=COLOR_FG, wraplength=450, justify="left").grid(row=4, column=0, sticky="w", pady=(5,0))
+        self.strip = ForecastStrip(self, RADAR_IMAGE_WIDTH, COLOR_BG, COLOR_FG, self.bold_font, self.tiny_font, self.small_font)
         self.hazards_frame = tk.Frame(self, bg=COLOR_BG, bd=1, relief="solid", padx=10, pady=10)
         self.radar_frame = tk.Frame(self, bg=COLOR_BG, bd=1, relief="solid", padx=10, pady=10)
         self.footer_frame = tk.Frame(self, bg=COLOR_BG)
-        self.hazards_label = tk.Label(self.hazards_frame, image=self.icons.get("hazard"), text=" Hazards", font=self.bold_font, bg=COLOR_BG, fg=COLOR_YELLOW, compound="left")
+        self.hazards_label = tk.Label(self.hazards_frame, image=self.icon("hazard"), text=" Hazards", font=self.bold_font, bg=COLOR_BG, fg=COLOR_YELLOW, compound="left")
         self.hazards_label.pack(anchor="w")
         self.hazards_var = tk.StringVar(value="")
         tk.Label(self.hazards_frame, textvariable=self.hazards_var, font=self.small_font, bg=COLOR_BG, fg=COLOR_YELLOW, wraplength=450, justify="left").pack(anchor="w")
@@ -189,6 +223,9 @@ class WeatherApp(tk.Tk):
         self.radar_label.pack()
         
         # --- Footer Widgets ---
+        self.debug_var = tk.StringVar(value="")
+        self.debug_label = tk.Label(self.footer_frame, textvariable=self.debug_var, font=self.tiny_font, bg=COLOR_BG, fg=COLOR_HEADER)
+        if DEBUG_OVERLAY: self.debug_label.pack(side="bottom", anchor="w")
         status_frame = tk.Frame(self.footer_frame, bg=COLOR_BG)
         status_frame.pack(side="left", expand=True, fill="x")
         self.last_updated_var = tk.StringVar(value="Last Updated: Never")
@@ -198,11 +235,51 @@ class WeatherApp(tk.Tk):
 
         button_frame = tk.Frame(self.footer_frame, bg=COLOR_BG)
         button_frame.pack(side="right")
+        tk.Button(button_frame, text="Animate Radar", command=self.toggle_radar_loop, font=self.tiny_font).pack(side="right", padx=5)
         tk.Button(button_frame, text="Toggle Radar", command=self.toggle_radar, font=self.tiny_font).pack(side="right", padx=5)
         tk.Button(button_frame, text="Refresh Now", command=self.refresh_now, font=self.tiny_font).pack(side="right")
 
+    def set_text(self, key, value):
+        """Show `value` in `<key>_var` (or the window title) unless it is already showing."""
+        if key in self.view and self.view[key] == value:
+            return
+        self.view[key] = value
+        if key == "title":
+            self.title(value)
+        elif value is not None:
+            getattr(self, f"{key}_var").set(value)
+
+    def set_history(self, temps):
+        """Move the 24 h sparkline to hourly temperatures `temps` (oldest first)."""
+        if self.view.get("temp_history") == temps:
+            return
+        self.view["temp_history"] = temps
+        points = strip.line_points(strip.scale(temps, 3, HISTORY_HEIGHT - 3), HISTORY_WIDTH / len(temps))
+        if len(points) < 4:
+            self.history_canvas.itemconfigure(self.history_line, state="hidden")
+            return
+        self.history_canvas.coords(self.history_line, *points)
+        self.history_canvas.itemconfigure(self.history_line, state="normal")
+
+    def set_image(self, key, label, image):
+        if self.view.get(key) is not image:
+            self.view[key] = image
+            label.config(image=image)
+
     def update_layout(self, has_hazards, has_radar):
+        """Grid the optional sections. Nothing is re-gridded or resized unless the set of visible sections changed."""
+        has_pressure = self.view.get("pressure", "") is not None  # shown until the grid says there is none
+        has_strip = self.strip.has_data()
+        layout = (has_strip, has_hazards, has_radar and self.radar_visible, has_pressure)
+        if layout == self.layout:
+            return
+        self.layout = layout
+        if has_pressure: self.pressure_frame.grid(row=5, column=0, columnspan=2, sticky="w")
+        else: self.pressure_frame.grid_forget()
         next_row = 3
+        if has_strip:
+            self.strip.grid(row=next_row, column=0, columnspan=2, sticky="ew", pady=(0, 5)); next_row += 1
+        else: self.strip.grid_forget()
         if has_hazards:
             self.hazards_frame.grid(row=next_row, column=0, columnspan=2, sticky="ew", pady=5); next_row += 1
         else: self.hazards_frame.grid_forget()
@@ -210,14 +287,13 @@ class WeatherApp(tk.Tk):
             self.radar_frame.grid(row=next_row, column=0, columnspan=2, sticky="ew", pady=10); next_row += 1
         else: self.radar_frame.grid_forget()
         self.footer_frame.grid(row=next_row, column=0, columnspan=2, sticky="ew", pady=(10, 0))
-        self.update_idletasks()
-        self.geometry(f"{self.winfo_reqwidth()}x{self.winfo_reqheight()}")
+        self.geometry("")  # back to the natural size; Tk resizes lazily, on idle, from here on
 
     def create_icon_label(self, parent, icon_name, row, text):
         frame = tk.Frame(parent, bg=COLOR_BG)
         frame.grid(row=row, column=0, columnspan=2, sticky="w")
         var = tk.StringVar(value=text)
-        tk.Label(frame, image=self.icons.get(icon_name), bg=COLOR_BG).pack(side="left")
+        tk.Label(frame, image=self.icon(icon_name), bg=COLOR_BG).pack(side="left")
         tk.Label(frame, textvariable=var, font=self.normal_font, bg=COLOR_BG, fg=COLOR_FG).pack(side="left")
         setattr(self, f"{icon_name}_var", var)
         return frame
@@ -227,77 +303,241 @@ class WeatherApp(tk.Tk):
         tk.Label(parent, textvariable=var, font=self.small_font, bg=COLOR_BG, fg=COLOR_FG).grid(row=row, column=col, sticky="w", padx=10)
         return var
 
+    def toggle_debug_overlay(self):
+        if self.debug_label.winfo_ismapped():
+            self.debug_label.pack_forget()
+        else:
+            self.debug_label.pack(side="bottom", anchor="w", before=self.footer_frame.pack_slaves()[0])
+            self.update_debug_overlay()
+
+    def update_debug_overlay(self):
+        last = metrics.last_durations()
+        parts = [f"{label} {last[stage] * 1000:.0f} ms" for label, stage in OVERLAY_STAGES if stage in last]
+        rss = metrics.rss_bytes()
+        if rss is not None: parts.append(f"RSS {rss / 2**20:.0f} MiB")
+        self.set_text("debug", "  ·  ".join(parts))
+
     def refresh_now(self):
-        if self.after_id: self.after_cancel(self.after_id)
-        self.update_weather()
+        self.update_weather(force=True)
 
     def toggle_radar(self):
+        # The last radar image is kept, so this is a pure layout change.
         self.radar_visible = not self.radar_visible
-        self.refresh_now()
+        self.update_layout(self.has_hazards, self.has_radar)
+        self.show_radar()
+
+    def toggle_radar_loop(self):
+        self.radar_loop = not self.radar_loop
+        if self.radar_loop and not self.radar_frames:
+            self.start_fetch()  # frames arrive with the next background fetch; the forecast is only refetched if due
+        self.show_radar()
+
+    def update_weather(self, force=False):
+        """Start a background refresh; the next one is scheduled when its results arrive. Never blocks the UI.
+
+        `force` refetches every forecast product instead of only those that are due.
+        With a broker only `force` asks it to refetch; it keeps its own schedule
+        otherwise, and a timed refresh just renews radar for its last message.
+        """
+        if self.after_id: self.after_cancel(self.after_id)
+        self.after_id = None
+        subscriber = self.subscriber
+        if subscriber is not None:
+            if self.broker_message is None:
+                return  # poll_results() renders the broker's first message when it arrives
+            if force:
+                subscriber.request_refresh()
+        self.start_fetch(force)
+
+    def start_fetch(self, force=False):
+        """Start a background fetch, or queue one to start when the fetch in flight lands."""
+        if self.subscriber is not None and self.broker_message is None:
+            return  # no forecast to fetch radar for until the broker's first message
+        if self.fetch_in_progress:
+            self.refetch = bool(self.refetch) or force
+            return
+        self.fetch_in_progress = True
+        self.set_text("next_update", "Updating...")
+        threading.Thread(target=self.fetch_in_background, args=(self.radar_loop, force), daemon=True).start()
 
-    def update_weather(self):
-        data = get_weather_data(LATITUDE, LONGITUDE)
-        moon_name, moon_emoji = get_moon_phase()
+    def schedule_update(self):
+        """Plan the next refresh for when the earliest product expires, per the server's cache headers."""
+        due = refresh_schedule.next_due() or time.time() + UPDATE_INTERVAL / 1000
+        self.next_update_time = max(due, time.time() + report.MIN_REFRESH_INTERVAL)
+        if self.after_id: self.after_cancel(self.after_id)
+        self.after_id = self.after(int((self.next_update_time - time.time()) * 1000), self.update_weather)
+
+    def fetch_in_background(self, with_loop, force=False):
+        # Runs on a worker thread: network, JSON parsing and image decoding only, no Tk calls.
+        with metrics.timed("refresh"):
+            if self.subscriber is not None:
+                self.deliver(self.broker_message["value"], with_loop)  # the broker owns the forecast; only radar is refreshed here
+            else:
+                self.deliver(get_weather_data(LATITUDE, LONGITUDE, force=force), with_loop)
+
+    def deliver(self, data, with_loop):
+        """Fetch radar imagery for `data` and hand everything to the Tk thread."""
+        radar_result, loop_result = (None, None), (None, None)
+        try:
+            if data:
+                cache.put(SNAPSHOT_KEY, data)
+                calls = {"image": partial(radar.fetch_image, data['radar_image_urls'], RADAR_IMAGE_WIDTH)}
+                if with_loop: calls["loop"] = partial(radar.fetch_loop, data['radar_loop_urls'], RADAR_IMAGE_WIDTH)
+                results = nws.run_concurrently(calls)
+                radar_result = results["image"] if not isinstance(results["image"], Exception) else (None, None)
+                if with_loop and not isinstance(results["loop"], Exception): loop_result = results["loop"]
+        finally:
+            self.results.put((data, radar_result, loop_result))
+
+    def listen_to_broker(self):
+        # Runs on its own thread for as long as the broker connection lasts.
+        while True:
+            try:
+                message = self.subscriber.receive()
+            except (OSError, ValueError) as e:
+                print(f"--- Debug: Lost the weather broker ({e}); fetching directly.")
+                self.subscriber.close()
+                self.subscriber = None
+                self.watch_alerts()
+                self.broker_messages.put(None)  # poll_results() starts fetching directly
+                return
+            if message["topic"] == "alerts":
+                if message["value"] is not None: self.alert_results.put(message["value"])
+                continue
+            self.broker_messages.put(message)
+
+    def watch_alerts(self):
+        """Poll NWS alerts on a daemon thread; results reach the hazards panel through poll_results()."""
+        poller = alerts.AlertPoller(LATITUDE, LONGITUDE)
+        threading.Thread(target=alerts.watch, args=(poller, self.alert_results.put), name="alerts", daemon=True).start()
+
+    def poll_results(self):
+        active = None
+        while not self.alert_results.empty():
+            active = self.alert_results.get_nowait()
+        if active is not None:
+            self.show_alerts(active)
+        message, lost = None, False
+        while not self.broker_messages.empty():
+            message = self.broker_messages.get_nowait()
+            lost = lost or message is None
+        if lost:
+            self.update_weather()  # nothing else would refetch if the broker went before its first report
+        elif message is not None:
+            self.broker_message = message
+            self.start_fetch()  # radar for the new forecast, after any fetch already in flight
+        try:
+            data, radar_result, loop_result = self.results.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            self.fetch_in_progress = False
+            with metrics.timed("render"):
+                self.render_weather(data, radar_result, loop_result)
+            self.schedule_update()
+            self.update_debug_overlay()
+            metrics.export()
+            if self.refetch is not None:
+                force, self.refetch = self.refetch, None
+                self.start_fetch(force)
+        self.after(POLL_INTERVAL, self.poll_results)
+
+    def show_alerts(self, active):
+        """Put a new set of active alerts in the hazards panel straight away, between forecast refreshes."""
+        self.active_alerts = active
+        self.set_text("hazards", view_model({}, active)["hazards"])
+        self.has_hazards = bool(self.view["hazards"])
+        self.update_layout(self.has_hazards, self.has_radar)
+
+    def show_snapshot(self):
+        """Render the last successful result from disk, marked stale, until a fresh fetch lands."""
+        data, stored = cache.get_entry(SNAPSHOT_KEY, cache.SNAPSHOT_MAX_AGE)
+        if data:
+            self.render_weather(data, (None, None), fetched_at=stored)
+
+    def mark_stale(self):
+        self.set_text("title", "Weather Report (stale)")
+        self.set_text("last_updated", f"Last Updated: {time.strftime('%H:%M:%S', time.localtime(self.data_time))} (stale)")
+
+    def render_weather(self, data, radar_result, loop_result=(None, None), fetched_at=None):
         if not data:
-            self.title("Error"); self.temp_var.set("Could not fetch weather data.")
+            if self.data_time:
+                self.mark_stale()  # keep showing the last good data through an outage
+                return
+            self.set_text("title", "Error"); self.set_text("temp", "Could not fetch weather data.")
+            self.has_hazards, self.has_radar = False, False
             self.update_layout(has_hazards=False, has_radar=False)
+            return
+        if fetched_at is None:
+            self.data_time = time.time()
+            self.set_text("last_updated", f"Last Updated: {time.strftime('%H:%M:%S')}{section_note(data)}")
+            self.set_text("title", "Weather Report")
         else:
-            self.last_update_time = time.time()
-            self.last_updated_var.set(f"Last Updated: {time.strftime('%H:%M:%S')}")
-            self.title("Weather Report")
-            self.temp_var.set(f"Temp: {data['current_temp']}°F")
-            self.feels_var.set(f"Feels Like: {data['apparent_temp']:.1f}°F")
-            self.humidity_var.set(f"Humidity: {data['humidity']:.1f}%")
-            self.dewpoint_var.set(f"Dewpoint: {data['dewpoint_f']:.1f}°F")
-            self.wind_var.set(f"Wind: {data['wind_speed_mph']:.1f} mph from {data['wind_direction']}°")
-            self.gust_var.set(f"Gusts: {data['wind_gust_mph']:.1f} mph")
-            self.sky_var.set(f"Sky Cover: {data['sky_cover']:.1f}%")
-            self.precip_var.set(f"Precip Chance: {data['prob_precip']:.1f}%")
-            
-            if data['pressure_in'] and data['pressure_in'] > 0:
-                self.pressure_var.set(f"Pressure: {data['pressure_in']:.2f} inHg")
-                self.pressure_frame.grid(row=5, column=0, columnspan=2, sticky="w")
-            else:
-                self.pressure_frame.grid_forget()
-
-            self.high_low_var.set(f"High: {data['max_temp']:.1f}°F   Low: {data['min_temp']:.1f}°F")
-            self.summary_var.set(f"Summary: {data['short_forecast']}")
-            
-            moon_name, moon_icon_name = get_moon_phase()
-            self.moon_phase_var.set(f"Moon Phase: {moon_name}")
-            moon_icon_key = moon_icon_name.split('.')[0] # a bit fragile, but works for now
-            if moon_icon_key in self.icons:
-                self.moon_icon_label.config(image=self.icons[moon_icon_key])
-            
-            self.detail_var.set(data['detailed_forecast'])
-            has_hazards = bool(data['hazards'])
-            if has_hazards: self.hazards_var.set("\n".join(data['hazards']))
-            has_radar = self.update_radar_image(data['radar_image_url'])
-            self.update_layout(has_hazards, has_radar)
-        self.after_id = self.after(UPDATE_INTERVAL, self.update_weather)
-
-    def update_radar_image(self, image_url):
-        if not image_url: return False
-        try:
-            response = requests.get(image_url, timeout=15)
-            response.raise_for_status()
-            image_data = io.BytesIO(response.content)
-            img = Image.open(image_data)
-            w_percent = (RADAR_IMAGE_WIDTH / float(img.size[0]))
-            h_size = int((float(img.size[1]) * float(w_percent)))
-            img = img.resize((RADAR_IMAGE_WIDTH, h_size), Image.LANCZOS)
-            self.radar_image = ImageTk.PhotoImage(img)
-            self.radar_label.config(image=self.radar_image)
-            return True
-        except Exception:
-            return False
+            self.data_time = fetched_at
+            self.mark_stale()
+        # Each section is drawn from its own endpoint; one that failed keeps what it showed last.
+        for key, value in view_model(data, self.active_alerts).items():
+            self.set_text(key, value)
+        self.has_hazards = bool(self.view.get('hazards'))
+        self.strip.set_series(data.get('hourly_strip'), data.get('daily_strip'))
+        if data.get('temp_history'): self.set_history(data['temp_history'])
+
+        moon_name, moon_icon_name = get_moon_phase()
+        self.set_text("moon_phase", f"Moon Phase: {moon_name}")
+        moon_icon_key = moon_icon_name.split('.')[0] # a bit fragile, but works for now
+        moon_icon = self.icon(moon_icon_key)
+        if moon_icon:
+            self.set_image("moon_icon", self.moon_icon_label, moon_icon)
+
+        from PIL import ImageTk
+        radar_key, radar_img = radar_result
+        if radar_img is not None and radar_key != self.radar_key:
+            self.radar_image = ImageTk.PhotoImage(radar_img)
+            self.radar_key = radar_key
+        loop_key, loop_frames = loop_result
+        if loop_frames and loop_key != self.radar_loop_key:
+            self.load_radar_frames(loop_frames)
+            self.radar_loop_key = loop_key
+        self.has_radar = self.radar_image is not None or bool(self.radar_frames)  # a failed radar fetch keeps the last image
+        self.update_layout(self.has_hazards, self.has_radar)
+        self.show_radar()
+
+    def load_radar_frames(self, frames):
+        # Frames already on screen keep their PhotoImage; the ring's maxlen caps memory.
+        from PIL import ImageTk
+        existing = dict(self.radar_frames)
+        self.radar_frames = deque(
+            ((digest, existing.get(digest) or ImageTk.PhotoImage(img)) for digest, img in frames),
+            maxlen=radar.RADAR_LOOP_FRAMES,
+        )
+        self.radar_frame_index = len(self.radar_frames) - 1
+
+    def show_radar(self):
+        if self.radar_loop and self.radar_visible and self.radar_frames:
+            if self.animation_id is None:
+                self.animate_radar()
+            return
+        if self.animation_id is not None:
+            self.after_cancel(self.animation_id)
+            self.animation_id = None
+        if self.radar_image is not None:
+            self.set_image("radar", self.radar_label, self.radar_image)
+
+    def animate_radar(self):
+        self.animation_id = None
+        if not (self.radar_loop and self.radar_visible and self.radar_frames):
+            return
+        self.radar_frame_index = (self.radar_frame_index + 1) % len(self.radar_frames)
+        self.set_image("radar", self.radar_label, self.radar_frames[self.radar_frame_index][1])
+        last = self.radar_frame_index == len(self.radar_frames) - 1
+        self.animation_id = self.after(RADAR_LOOP_PAUSE if last else RADAR_FRAME_DELAY, self.animate_radar)
 
     def update_countdown(self):
-        if self.last_update_time > 0:
-            remaining = (self.last_update_time + UPDATE_INTERVAL / 1000) - time.time()
+        if self.next_update_time > 0 and not self.fetch_in_progress:
+            remaining = self.next_update_time - time.time()
             if remaining > 0:
                 minutes, seconds = divmod(int(remaining), 60)
-                self.next_update_var.set(f"Next update in: {minutes:02d}:{seconds:02d}")
+                self.set_text("next_update", f"Next update in: {minutes:02d}:{seconds:02d}")
         self.after(1000, self.update_countdown)
 
 def main():
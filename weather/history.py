@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+"""Compact on-disk history of the current-conditions values, for trends.
+
+Every refresh appends one fixed-width record (epoch plus the FIELDS of a
+report.summarize() dict, as float32, NaN when missing) to a memory-mapped
+ring buffer under the cache directory. The file never grows past
+CAPACITY records: appends are O(1) and overwrite the oldest record once it
+is full, and range reads unpack straight out of the mapping without
+copying it. Several processes (GUI, LEDs, broker) may share one file;
+appends take an flock and are skipped when another process recorded less
+than MIN_INTERVAL seconds ago.
+
+change() and hourly() answer the questions the displays ask: how much did
+pressure move in the last three hours, what did the temperature do over
+the last day.
+"""
+import fcntl
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from . import cache
+
+# --- Configuration ---
+HISTORY_PATH = os.path.join(cache.CACHE_DIR, "history.bin")
+FIELDS = (
+    'current_temp', 'apparent_temp', 'dewpoint_f', 'humidity', 'pressure_in',
+    'wind_speed_mph', 'wind_gust_mph', 'sky_cover', 'prob_precip',
+)
+CAPACITY = 8192     # records; about four weeks at one every five minutes (~360 KB)
+MIN_INTERVAL = 300  # seconds between records, however many processes refresh
+TENDENCY_HOURS = 3  # pressure tendency window, as in surface observations
+TENDENCY_STEADY = 0.02  # inHg; smaller changes over TENDENCY_HOURS count as steady
+
+MAGIC = b"WXHIST1\0"
+HEADER = struct.Struct("<8sIIQQ")  # magic, field count, capacity, next slot, record count
+RECORD = struct.Struct("<d" + "f" * len(FIELDS))
+
+
+@contextmanager
+def _locked(fd):
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH, capacity=CAPACITY):
+        self.path = path
+        os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = HEADER.size + capacity * RECORD.size
+        with _locked(self.fd):
+            header = os.pread(self.fd, HEADER.size, 0)
+            magic, field_count, stored_capacity, _, _ = HEADER.unpack(header) if len(header) == HEADER.size else (None,) * 5
+            if magic != MAGIC or field_count != len(FIELDS) or stored_capacity != capacity:
+                os.ftruncate(self.fd, 0)  # new, foreign or differently shaped file: start over
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, len(FIELDS), capacity, 0, 0), 0)
+        self.capacity = capacity
+        self.map = mmap.mmap(self.fd, size)
+        self.view = memoryview(self.map)
+
+    def _cursor(self):
+        _, _, _, head, count = HEADER.unpack_from(self.map, 0)
+        return head, count
+
+    def _offset(self, i, head, count):
+        """Byte offset of the i-th oldest record."""
+        return HEADER.size + (head - count + i) % self.capacity * RECORD.size
+
+    def _time_at(self, i, head, count):
+        return struct.unpack_from("<d", self.map, self._offset(i, head, count))[0]
+
+    def _search(self, t, head, count):
+        """Index of the oldest record at or after epoch `t` (records are in time order)."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time_at(mid, head, count) < t: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def __len__(self):
+        return self._cursor()[1]
+
+    def append(self, values, t=None):
+        """Record the FIELDS of `values` at epoch `t` (default now).
+
+        Returns False, writing nothing, if the newest record is less than
+        MIN_INTERVAL seconds older than `t`.
+        """
+        t = time.time() if t is None else t
+        record = [t] + [math.nan if values.get(name) is None else float(values[name]) for name in FIELDS]
+        with _locked(self.fd):
+            head, count = self._cursor()
+            if count and t - self._time_at(count - 1, head, count) < MIN_INTERVAL:
+                return False
+            RECORD.pack_into(self.map, HEADER.size + head * RECORD.size, *record)
+            HEADER.pack_into(self.map, 0, MAGIC, len(FIELDS), self.capacity, (head + 1) % self.capacity, min(count + 1, self.capacity))
+        return True
+
+    def records(self, since=None, until=None):
+        """Yield (epoch, *FIELDS) tuples with since <= epoch < until, oldest first."""
+        head, count = self._cursor()
+        lo = 0 if since is None else self._search(since, head, count)
+        hi = count if until is None else self._search(until, head, count)
+        if lo >= hi:
+            return
+        # At most two contiguous runs of the ring; iter_unpack reads them in place.
+        first = self._offset(lo, head, count)
+        last = self._offset(hi - 1, head, count) + RECORD.size
+        if first < last:
+            yield from RECORD.iter_unpack(self.view[first:last])
+        else:
+            yield from RECORD.iter_unpack(self.view[first:])
+            yield from RECORD.iter_unpack(self.view[HEADER.size:last])
+
+    def series(self, field, since=None, until=None):
+        """(epochs, values) arrays for `field`, skipping missing values."""
+        column = FIELDS.index(field) + 1
+        times, values = array("d"), array("d")
+        for record in self.records(since, until):
+            if not math.isnan(record[column]):
+                times.append(record[0])
+                values.append(record[column])
+        return times, values
+
+    def change(self, field, seconds, now=None):
+        """Latest value of `field` minus its value `seconds` earlier.
+
+        With a gap or a young file the oldest value in the window is used, as
+        long as it covers at least half of `seconds`; otherwise None.
+        """
+        now = time.time() if now is None else now
+        times, values = self.series(field, now - seconds - MIN_INTERVAL)
+        if len(values) < 2 or times[-1] - times[0] < seconds / 2:
+            return None
+        i = bisect_left(times, times[-1] - seconds)
+        return values[-1] - values[i]
+
+    def hourly(self, field, hours=24, now=None):
+        """Mean of `field` for each of the last `hours` hours, oldest first; None where nothing was recorded."""
+        now = time.time() if now is None else now
+        start = now - hours * 3600
+        sums, counts = [0.0] * hours, [0] * hours
+        for t, value in zip(*self.series(field, start, now)):
+            bucket = min(hours - 1, int((t - start) // 3600))
+            sums[bucket] += value
+            counts[bucket] += 1
+        return [round(s / n, 2) if n else None for s, n in zip(sums, counts)]
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        os.close(self.fd)
+
+
+_store = None
+
+
+def store():
+    """The shared HistoryStore, opened on first use; None if the file can't be used."""
+    global _store
+    if _store is None:
+        try:
+            _store = HistoryStore()
+        except (OSError, ValueError) as e:
+            print(f"Warning: history unavailable: {e}")
+            _store = False
+    return _store or None
+
+
+def record(summary, t=None):
+    """Append a report.summarize() dict to the shared history, if there is one."""
+    history = store()
+    if history is not None:
+        history.append(summary, t)
+
+
+def trends(now=None):
+    """Trend values for the displays: pressure change over TENDENCY_HOURS (inHg) and hourly temperatures for the last day."""
+    history = store()
+    if history is None:
+        return {}
+    tendency = history.change('pressure_in', TENDENCY_HOURS * 3600, now)
+    return {
+        "pressure_tendency": None if tendency is None else round(tendency, 3),
+        "temp_history": history.hourly('current_temp', 24, now),
+    }
+
+
+def describe_tendency(change):
+    """"rising", "falling" or "steady" for a pressure_tendency value; None when it is unknown."""
+    if change is None:
+        return None
+    if abs(change) < TENDENCY_STEADY:
+        return "steady"
+    return "rising" if change > 0 else "falling"
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""Timer-driven LED engine for weather-leds.
+
+The engine owns the LED pins on its own thread. Callers hand it a target
+(solid temperature LED plus an optional precipitation pattern) with
+set_target(), and turn the alert overlay on or off with set_alert(); both
+swap one tuple atomically, so fetching can run in the
+main thread without ever stalling a blink. Transitions are scheduled on
+absolute monotonic deadlines, so timing errors never accumulate, and how
+late each transition actually fired is recorded for jitter_stats().
+"""
+import threading
+import time
+from collections import deque
+
+from . import metrics
+
+# (on_time, off_time) in seconds for each precipitation intensity
+PATTERNS = {"light": (1.5, 1.5), "moderate": (0.75, 0.75), "heavy": (0.25, 0.25)}
+ALERT_FLASHES = 3    # all LEDs flash this many times...
+ALERT_FLASH = 0.15   # ...for this long on and off...
+ALERT_HOLD = 2.0     # ...then the solid temperature LED shows for this long
+JITTER_HISTORY = 1000
+
+
+class LedEngine:
+    def __init__(self, gpio, pins, rain_pin, snow_pin):
+        self.gpio = gpio
+        self.pins = list(pins)
+        self.rain_pin = rain_pin
+        self.snow_pin = snow_pin
+        self.pin_state = {pin: False for pin in self.pins}  # what we last wrote; never read back
+        self.lateness = deque(maxlen=JITTER_HISTORY)          # seconds each transition fired late
+        self._target = (None, None, None, False)              # (solid_pin, precip_type, intensity, alert)
+        self._wakeup = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="led-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._wakeup:
+            self._running = False
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def set_target(self, solid_pin, precip_type=None, intensity=None):
+        """Show `solid_pin` lit, overlaid with a precipitation blink pattern if given."""
+        with self._wakeup:
+            self._target = (solid_pin, precip_type, intensity, self._target[3])
+            self._wakeup.notify()
+
+    def set_alert(self, active):
+        """Turn the severe-alert flash, which overrides the precipitation pattern, on or off."""
+        with self._wakeup:
+            if self._target[3] != active:
+                self._target = self._target[:3] + (active,)
+                self._wakeup.notify()
+
+    def jitter_stats(self):
+        """Summary of transition lateness in milliseconds, or None before any blink."""
+        samples = sorted(self.lateness)
+        if not samples:
+            return None
+        return {
+            "count": len(samples),
+            "mean_ms": 1000 * sum(samples) / len(samples),
+            "p99_ms": 1000 * samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max_ms": 1000 * samples[-1],
+        }
+
+    def _write(self, states):
+        for pin, on in states.items():
+            if self.pin_state.get(pin) != on:
+                self.gpio.output(pin, self.gpio.HIGH if on else self.gpio.LOW)
+                self.pin_state[pin] = on
+
+    def _steps(self, solid_pin, precip_type, intensity, alert=False):
+        """The repeating sequence of (pin states, hold seconds) for a target."""
+        solid = {pin: pin == solid_pin for pin in self.pins}
+        if alert:
+            flash = [({pin: True for pin in self.pins}, ALERT_FLASH), ({pin: False for pin in self.pins}, ALERT_FLASH)]
+            return flash * ALERT_FLASHES + [(solid, ALERT_HOLD)]
+        if not precip_type or intensity not in PATTERNS:
+            return [(solid, None)]
+        on_time, off_time = PATTERNS[intensity]
+        if precip_type == "sleet":
+            # Alternate the rain and snow LEDs; this overrides the solid colour while it runs.
+            return [
+                ({**solid, self.rain_pin: True, self.snow_pin: False}, on_time / 2),
+                ({**solid, self.rain_pin: False, self.snow_pin: True}, on_time / 2),
+            ]
+        blink_pin = self.snow_pin if precip_type == "snow" else self.rain_pin
+        return [
+            ({**solid, blink_pin: True}, on_time),
+            ({**solid, blink_pin: False}, off_time),
+        ]
+
+    def _run(self):
+        with self._wakeup:
+            while self._running:
+                target = self._target
+                steps = self._steps(*target)
+                deadline = time.monotonic()
+                while self._running and self._target is target:
+                    for states, hold in steps:
+                        self._write(states)
+                        if hold is None:
+                            self._wakeup.wait()  # solid colour: sleep until the target changes
+                            break
+                        deadline += hold
+                        while self._running and self._target is target:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._wakeup.wait(remaining)
+                        if not self._running or self._target is not target:
+                            break
+                        late = time.monotonic() - deadline
+                        self.lateness.append(late)
+                        metrics.observe("led_blink_lateness", late)
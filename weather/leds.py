@@ -1,11 +1,15 @@
 #!/usr/bin/python3
-import RPi.GPIO as GPIO
-import requests
 import time
 import sys
 import signal
 import argparse
+import threading
+from bisect import bisect_right
+from datetime import datetime
 from .config import LATITUDE, LONGITUDE
+from . import alerts, cache, gpio, history, metrics, nws, report
+from .gridseries import GridData
+from .ledengine import LedEngine
 
 # --- Configuration ---
 RED_LED = 23
@@ -15,15 +19,30 @@ LED_PINS = [RED_LED, GREEN_LED, BLUE_LED]
 TEMP_DEVIATION = 10
 PRECIP_HEAVY = 0.30
 PRECIP_MODERATE = 0.10
-CHECK_INTERVAL = 1800
+CHECK_INTERVAL = 6 * 3600  # the schedule runs SCHEDULE_HOURS ahead, so refetch rarely
+MIN_CHECK_INTERVAL = 3600  # even when the server says the forecast expires sooner (see report.refresh_schedule)
+RETRY_INTERVAL = 300
+SCHEDULE_HOURS = 48
+SNAPSHOT_KEY = "schedule_leds"
+HEADERS = {'User-Agent': 'MyWeatherLED/1.0 (myemail@example.com)'}
+
+GPIO = None  # GPIO backend (see weather/gpio.py), loaded by setup_gpio() so that argument parsing stays fast
+engine = None  # LedEngine driving the pins once main() has set up GPIO
 
 def graceful_exit(signum, frame):
     print("\nSignal received. Cleaning up GPIO...")
-    GPIO.cleanup()
+    if engine is not None:
+        engine.stop()
+        stats = engine.jitter_stats()
+        if stats: print(f"Blink timing: {stats['count']} transitions, mean {stats['mean_ms']:.2f} ms late, p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+    if GPIO is not None: GPIO.cleanup()
+    nws.close()
     print("GPIO cleaned up. Exiting.")
     sys.exit(0)
 
-def setup_gpio():
+def setup_gpio(simulate=False):
+    global GPIO
+    GPIO = gpio.load(simulate)
     GPIO.setmode(GPIO.BCM)
     GPIO.setwarnings(False)
     for pin in LED_PINS:
@@ -31,56 +50,37 @@ def setup_gpio():
         GPIO.output(pin, GPIO.LOW)
 
 def get_weather_data(lat, lon):
+    """Fetch the hourly forecast and QPF and compile them into an LED schedule.
+
+    Returns the schedule from build_schedule(), or None if the hourly
+    forecast could not be fetched. Without gridpoint QPF, forecast
+    precipitation blinks at the "light" rate.
+    """
     try:
-        points_url = f"https://api.weather.gov/points/{lat},{lon}"
-        headers = {'User-Agent': 'MyWeatherLED/1.0 (myemail@example.com)'}
-        points_res = requests.get(points_url, headers=headers, timeout=15)
-        points_res.raise_for_status()
-        properties = points_res.json()['properties']
-        hourly_url = properties['forecastHourly']
-        grid_data_url = properties['forecastGridData']
-
-        hourly_res = requests.get(hourly_url, headers=headers, timeout=15)
-        hourly_res.raise_for_status()
-        hourly_periods = hourly_res.json()['properties']['periods']
+        results, status = report.fetch_products(lat, lon, HEADERS, names=("hourly", "grid"))
+        if "hourly" not in results: raise RuntimeError(status["hourly"]["error"])
+        if status["grid"]["state"] != "ok": print(f"Warning: gridpoint QPF {status['grid']['state']}: {status['grid']['error']}", file=sys.stderr)
+        hourly_periods = results["hourly"]['properties']['periods']
         if not hourly_periods: raise ValueError("Hourly forecast data is empty.")
-        
+        schedule = build_schedule(hourly_periods, GridData(results.get("grid", {}), names=('quantitativePrecipitation',)))
+        history.record(report.summarize(results["hourly"], None, results.get("grid")))
+
         current_period = hourly_periods[0]
-        current_temp = current_period['temperature']
-        short_forecast = current_period['shortForecast'].lower()
-        temps_next_24_hours = [p['temperature'] for p in hourly_periods[:24]]
-        avg_temp = sum(temps_next_24_hours) / len(temps_next_24_hours)
-
-        grid_res = requests.get(grid_data_url, headers=headers, timeout=15)
-        grid_res.raise_for_status()
-        precip_values = grid_res.json()['properties']['quantitativePrecipitation']['values']
-        current_precip_mm = precip_values[0]['value'] if precip_values and precip_values[0]['value'] is not None else 0.0
-        current_precip_in = current_precip_mm / 25.4
-
-        print(f"Fetched: Temp={current_temp}°F, Avg={avg_temp:.1f}°F, Precip={current_precip_in:.3f} in/hr, Forecast='{short_forecast}'")
-        return current_temp, avg_temp, short_forecast, current_precip_in
+        tendency = history.describe_tendency(history.trends().get("pressure_tendency"))
+        print(f"Fetched: Temp={current_period['temperature']}°F, Forecast='{current_period['shortForecast'].lower()}', "
+              f"{f'Pressure {tendency}, ' if tendency else ''}"
+              f"{len(schedule)} hourly LED states through {time.strftime('%a %H:%M', time.localtime(schedule[-1][1]))}")
+        return schedule
     except Exception as e:
         print(f"Error fetching weather data: {e}", file=sys.stderr)
-        return None, None, None, None
-
-def update_leds(current_temp, avg_temp, forecast, precip_in):
-    """Set temperature LED and determine precipitation type/intensity."""
-    # First, set the solid temperature LED
-    if current_temp > avg_temp + TEMP_DEVIATION:
-        GPIO.output(RED_LED, GPIO.HIGH)
-        GPIO.output(GREEN_LED, GPIO.LOW)
-        GPIO.output(BLUE_LED, GPIO.LOW)
-        print("Condition: Warmer than average")
-    elif current_temp < avg_temp - TEMP_DEVIATION:
-        GPIO.output(RED_LED, GPIO.LOW)
-        GPIO.output(GREEN_LED, GPIO.LOW)
-        GPIO.output(BLUE_LED, GPIO.HIGH)
-        print("Condition: Cooler than average")
-    else:
-        GPIO.output(RED_LED, GPIO.LOW)
-        GPIO.output(GREEN_LED, GPIO.HIGH)
-        GPIO.output(BLUE_LED, GPIO.LOW)
-        print("Condition: About average")
+        return None
+
+def led_state(current_temp, avg_temp, forecast, precip_in):
+    """Map one hour of forecast to the (solid_pin, precip_type, intensity) to show."""
+    # First, pick the solid temperature LED
+    if current_temp > avg_temp + TEMP_DEVIATION: solid_pin = RED_LED
+    elif current_temp < avg_temp - TEMP_DEVIATION: solid_pin = BLUE_LED
+    else: solid_pin = GREEN_LED
 
     # Second, determine if there is precipitation
     precip_type = None
@@ -93,91 +93,159 @@ def update_leds(current_temp, avg_temp, forecast, precip_in):
         if precip_in > PRECIP_HEAVY: intensity = "heavy"
         elif precip_in > PRECIP_MODERATE: intensity = "moderate"
         else: intensity = "light"
-        print(f"Precipitation: {precip_type.capitalize()} ({intensity})")
-    
-    return precip_type, intensity
-
-def handle_precipitation(precip_type, intensity, duration):
-    """Blinks LEDs for precipitation, leaving temperature LED on."""
-    patterns = {"light": (1.5, 1.5), "moderate": (0.75, 0.75), "heavy": (0.25, 0.25)}
-    on_time, off_time = patterns[intensity]
-    
-    end_time = time.time() + duration
-    while time.time() < end_time:
-        if precip_type == "rain":
-            GPIO.output(GREEN_LED, not GPIO.input(GREEN_LED)) # Toggle Green
-            time.sleep(on_time)
-        elif precip_type == "snow":
-            GPIO.output(BLUE_LED, not GPIO.input(BLUE_LED)) # Toggle Blue
-            time.sleep(on_time)
-        elif precip_type == "sleet":
-            # This case is tricky, as it needs to override the solid green/blue
-            # For now, we will just alternate, which will look odd with a solid color
-            GPIO.output(GREEN_LED, GPIO.HIGH)
-            GPIO.output(BLUE_LED, GPIO.LOW)
-            time.sleep(on_time / 2)
-            GPIO.output(GREEN_LED, GPIO.LOW)
-            GPIO.output(BLUE_LED, GPIO.HIGH)
-            time.sleep(on_time / 2)
-
-        if time.time() >= end_time: break
-        # The 'off' period is handled by the toggle, but we need to wait
-        if precip_type != 'sleet':
-             time.sleep(off_time)
-
-
-def run_self_test():
+    return solid_pin, precip_type, intensity
+
+def build_schedule(hourly_periods, grid, hours=SCHEDULE_HOURS):
+    """Compile hourly periods and gridpoint QPF into LED states.
+
+    Returns [start_epoch, end_epoch, solid_pin, precip_type, intensity] rows,
+    one per hourly period. Each hour's temperature is compared with the
+    average of the 24 hours starting at it, which is what the live check
+    does for the current hour.
+    """
+    temps = [p['temperature'] for p in hourly_periods]
+    schedule = []
+    for i, period in enumerate(hourly_periods[:hours]):
+        window = temps[i:i + 24]
+        start = datetime.fromisoformat(period['startTime']).timestamp()
+        end = datetime.fromisoformat(period['endTime']).timestamp()
+        precip_in = grid.value_at('quantitativePrecipitation', start, default=0.0) / 25.4
+        state = led_state(period['temperature'], sum(window) / len(window), period['shortForecast'].lower(), precip_in)
+        schedule.append([start, end, *state])
+    return schedule
+
+def schedule_state(schedule, t):
+    """Return (state, until) for epoch `t`.
+
+    `state` is the (solid_pin, precip_type, intensity) in effect, or None when
+    `t` is outside the schedule; `until` is when that changes (None if never).
+    """
+    i = bisect_right([row[0] for row in schedule], t) - 1
+    if i >= 0 and t < schedule[i][1]:
+        return tuple(schedule[i][2:]), schedule[i][1]
+    return None, schedule[i + 1][0] if i + 1 < len(schedule) else None
+
+def update_leds(engine, state):
+    """Show one (solid_pin, precip_type, intensity) state on the LEDs."""
+    solid_pin, precip_type, intensity = state
+    print("Condition: " + {RED_LED: "Warmer than average", BLUE_LED: "Cooler than average", GREEN_LED: "About average"}[solid_pin])
+    if precip_type: print(f"Precipitation: {precip_type.capitalize()} ({intensity})")
+    # The engine swaps to the new state atomically and keeps blinking on its own thread.
+    engine.set_target(solid_pin, precip_type, intensity)
+
+def show_alerts(engine, active):
+    """Flash all LEDs while a severe or extreme alert is in effect."""
+    print("Alerts: " + ("; ".join(alerts.describe(alert) for alert in active) or "none"))
+    engine.set_alert(alerts.is_urgent(active))
+
+def watch_alerts(engine):
+    """Poll NWS alerts on a daemon thread; used when no broker does it for us."""
+    poller = alerts.AlertPoller(LATITUDE, LONGITUDE, HEADERS)
+    threading.Thread(target=alerts.watch, args=(poller, lambda active: show_alerts(engine, active)), name="alerts", daemon=True).start()
+
+def handle_precipitation(engine, solid_pin, precip_type, intensity, duration):
+    """Shows a solid temperature LED with a precipitation blink pattern for `duration` seconds."""
+    engine.set_target(solid_pin, precip_type, intensity)
+    time.sleep(duration)
+
+
+def run_self_test(engine):
     print("--- Starting Self-Test Mode ---")
     test_duration = 5
     try:
         print("\nTesting: Warmer (Solid Red) + Rain (Blinking Green)")
-        GPIO.output(RED_LED, GPIO.HIGH)
-        handle_precipitation("rain", "moderate", test_duration)
-        GPIO.output(RED_LED, GPIO.LOW)
+        handle_precipitation(engine, RED_LED, "rain", "moderate", test_duration)
 
         print("\nTesting: Average (Solid Green) + Snow (Blinking Blue)")
-        GPIO.output(GREEN_LED, GPIO.HIGH)
-        handle_precipitation("snow", "light", test_duration)
-        GPIO.output(GREEN_LED, GPIO.LOW)
+        handle_precipitation(engine, GREEN_LED, "snow", "light", test_duration)
 
         print("\nTesting: Cooler (Solid Blue) + Sleet (Alt. Green/Blue)")
-        GPIO.output(BLUE_LED, GPIO.HIGH)
-        handle_precipitation("sleet", "heavy", test_duration)
-        GPIO.output(BLUE_LED, GPIO.LOW)
+        handle_precipitation(engine, BLUE_LED, "sleet", "heavy", test_duration)
+
+        print("\nTesting: Severe weather alert (all LEDs flash)")
+        engine.set_alert(True)
+        handle_precipitation(engine, GREEN_LED, None, None, test_duration)
+        engine.set_alert(False)
+        engine.set_target(None)
         
         print("\n--- Self-Test Complete ---")
     except KeyboardInterrupt:
         print("\nSelf-test interrupted.")
 
 def main():
+    global engine
     parser = argparse.ArgumentParser(description="Run a weather indicator LED.")
     parser.add_argument('-d', '--duration', type=int, default=30, help='Duration to run in seconds.')
     parser.add_argument('-t', '--test', action='store_true', help='Run a self-test.')
+    parser.add_argument('-s', '--simulate', action='store_true', help='Use the simulated GPIO backend (no Raspberry Pi needed).')
     args = parser.parse_args()
 
     signal.signal(signal.SIGTERM, graceful_exit)
     signal.signal(signal.SIGINT, graceful_exit)
-    setup_gpio()
+    metrics.start("leds")
+    setup_gpio(args.simulate)
+    engine = LedEngine(GPIO, LED_PINS, rain_pin=GREEN_LED, snow_pin=BLUE_LED)
+    engine.start()
 
     try:
         if args.test:
-            run_self_test()
+            run_self_test(engine)
         else:
             print(f"Starting Weather LED script for {args.duration} seconds...")
-            start_time = time.time()
-            while time.time() - start_time < args.duration:
-                remaining = args.duration - (time.time() - start_time)
-                data = get_weather_data(LATITUDE, LONGITUDE)
-                if all(v is not None for v in data):
-                    precip_type, intensity = update_leds(*data)
-                    action_duration = min(CHECK_INTERVAL, remaining)
-                    if precip_type and intensity:
-                        handle_precipitation(precip_type, intensity, action_duration)
+            end_time = time.time() + args.duration
+            # Play the last successful schedule straight away; the first fetch replaces it.
+            schedule, stored = cache.get_entry(SNAPSHOT_KEY, cache.SNAPSHOT_MAX_AGE)
+            if schedule:
+                print(f"Playing LED schedule fetched at {time.strftime('%H:%M:%S', time.localtime(stored))} (stale).")
+            from . import broker
+            subscriber = broker.connect(("schedule", "alerts"))  # a local broker does the fetching for us
+            if subscriber: print(f"Subscribed to the weather broker on {broker.SOCKET_PATH}.")
+            else: watch_alerts(engine)
+            shown = None
+            next_fetch = time.time()
+            while time.time() < end_time:
+                # Between fetches the schedule is played locally, changing state on the hour.
+                state, until = schedule_state(schedule or [], time.time())
+                if state != shown:
+                    if state: update_leds(engine, state)
+                    else:
+                        print("No forecast covers this hour; LEDs off.")
+                        engine.set_target(None)
+                    shown = state
+                if subscriber:
+                    wake = min(t for t in (until, end_time) if t is not None)
+                    try:
+                        message = subscriber.receive(timeout=max(0, wake - time.time()))
+                    except (OSError, ValueError) as e:
+                        print(f"Lost the weather broker ({e}); fetching directly.")
+                        subscriber.close()
+                        subscriber, next_fetch = None, time.time()
+                        watch_alerts(engine)
+                        continue
+                    if message and message["topic"] == "alerts":
+                        if message["value"] is not None: show_alerts(engine, message["value"])
+                    elif message and message["value"]:
+                        schedule = message["value"]
+                        cache.put(SNAPSHOT_KEY, schedule)
+                    elif message:
+                        print("Broker fetch failed; keeping last known schedule (stale).")
+                    continue
+                if time.time() >= next_fetch:
+                    with metrics.timed("led_fetch"):
+                        fresh = get_weather_data(LATITUDE, LONGITUDE)
+                    metrics.export()
+                    if fresh:
+                        schedule = fresh
+                        cache.put(SNAPSHOT_KEY, schedule)
+                        due = report.refresh_schedule.next_due(("hourly", "grid")) or time.time() + CHECK_INTERVAL
+                        next_fetch = min(max(due, time.time() + MIN_CHECK_INTERVAL), time.time() + CHECK_INTERVAL)
                     else:
-                        time.sleep(action_duration)
-                else:
-                    print("Retrying in 5 minutes...")
-                    time.sleep(min(300, remaining))
+                        print("Retrying in 5 minutes...")
+                        next_fetch = time.time() + RETRY_INTERVAL
+                        if schedule: print("Keeping last known schedule (stale).")
+                    continue
+                wake = min(t for t in (until, next_fetch, end_time) if t is not None)
+                time.sleep(max(0, wake - time.time()))
     finally:
         graceful_exit(None, None)
 
@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+"""In-process metrics: per-stage latency histograms, byte counters and memory.
+
+Hot paths call observe()/timed() with a stage name ("request_gridpoints",
+"json_parse", "radar_decode", "render", ...) and add_bytes() for payload
+sizes. Recording is a bisect and a few additions under one lock, so it is
+always on. render() formats everything, plus process RSS, in the
+Prometheus text exposition format.
+
+Exporting is opt-in, per process, from the environment:
+    WEATHER_METRICS_FILE  write the metrics here after every refresh
+                          ("{tool}" is replaced by gui, leds, broker, ...),
+                          e.g. for node_exporter's textfile collector
+    WEATHER_METRICS_PORT  serve them at http://127.0.0.1:<port>/metrics
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; the last, implicit bucket is +Inf.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+FILE_ENV = "WEATHER_METRICS_FILE"
+PORT_ENV = "WEATHER_METRICS_PORT"
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> {"buckets": [count per bucket], "sum": seconds, "count": n}
+_last = {}        # stage -> most recent duration in seconds
+_bytes = {}       # stage -> total bytes
+_tool = "weather"
+_file = None
+_server = None
+
+
+def observe(stage, seconds):
+    """Record one duration for `stage`."""
+    i = bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0}
+        histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+        _last[stage] = seconds
+
+
+@contextmanager
+def timed(stage):
+    """Context manager that observe()s how long its body took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def add_bytes(stage, count):
+    if count:
+        with _lock:
+            _bytes[stage] = _bytes.get(stage, 0) + count
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024  # Linux reports KiB
+
+
+def last_durations():
+    """Most recent duration of every stage, in seconds."""
+    with _lock:
+        return dict(_last)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    label = f'tool="{_tool}"'
+    lines = [
+        "# HELP weather_stage_duration_seconds Time spent in each refresh stage.",
+        "# TYPE weather_stage_duration_seconds histogram",
+    ]
+    with _lock:
+        histograms = {stage: (list(h["buckets"]), h["sum"], h["count"]) for stage, h in _histograms.items()}
+        byte_totals = dict(_bytes)
+    for stage, (buckets, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), buckets):
+            cumulative += n
+            lines.append(f'weather_stage_duration_seconds_bucket{{{label},stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'weather_stage_duration_seconds_sum{{{label},stage="{stage}"}} {total:.6f}')
+        lines.append(f'weather_stage_duration_seconds_count{{{label},stage="{stage}"}} {count}')
+    lines += ["# HELP weather_stage_bytes_total Payload bytes handled by each stage.", "# TYPE weather_stage_bytes_total counter"]
+    for stage, total in sorted(byte_totals.items()):
+        lines.append(f'weather_stage_bytes_total{{{label},stage="{stage}"}} {total}')
+    rss = rss_bytes()
+    if rss is not None:
+        lines += ["# HELP weather_resident_memory_bytes Resident set size.", "# TYPE weather_resident_memory_bytes gauge",
+                  f"weather_resident_memory_bytes{{{label}}} {rss}"]
+    lines += ["# HELP weather_peak_resident_memory_bytes Peak resident set size.", "# TYPE weather_peak_resident_memory_bytes gauge",
+              f"weather_peak_resident_memory_bytes{{{label}}} {peak_rss_bytes()}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """Write render() to `path` atomically."""
+    import tempfile
+    directory = os.path.dirname(path) or "."
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write metrics to '{path}': {e}")
+
+
+def serve(port):
+    """Serve render() at http://127.0.0.1:<port>/metrics from a daemon thread."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+
+
+def start(tool):
+    """Label this process's metrics with `tool` and start whichever exporters the environment asks for."""
+    global _tool, _file
+    _tool = tool
+    path = os.environ.get(FILE_ENV)
+    _file = path.replace("{tool}", tool) if path else None
+    port = os.environ.get(PORT_ENV)
+    if port and _server is None:
+        try:
+            serve(int(port))
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not serve metrics on port {port}: {e}")
+
+
+def export():
+    """Write the metrics file, if one was configured; call after each refresh."""
+    if _file:
+        write_textfile(_file)
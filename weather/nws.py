@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+"""Shared HTTP client for the National Weather Service API.
+
+Both the GUI and the LED script go through this module so that every request
+reuses one keep-alive session instead of opening a fresh TCP+TLS connection.
+`requests`, the thread pool and the optional codecs are imported on first use, so importing
+this module stays cheap for code paths that never touch the network.
+"""
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from . import cache, metrics
+
+# --- Configuration ---
+DEFAULT_TIMEOUT = 15
+POOL_CONNECTIONS = 4   # distinct hosts (api.weather.gov, radar.weather.gov, ...)
+POOL_MAXSIZE = 8       # concurrent connections kept alive per host
+TIMING_HISTORY = 100
+FETCH_DEADLINE = 20    # overall budget in seconds for a concurrent fan-out
+RETRIES = 2            # extra attempts (retries and hedges) per endpoint within its budget
+RETRY_BACKOFF = 0.5    # seconds; retry n waits a random time up to RETRY_BACKOFF * 2**n
+HEDGE_AFTER = 4.0      # seconds before a duplicate request is raced against a slow one
+API_BASE = os.environ.get("WEATHER_API_BASE", "https://api.weather.gov")  # overridable for benchmarks/nws_standin.py
+RADAR_STATIONS_URL = f"{API_BASE}/radar/stations"
+POINT_FIELDS = ("forecast", "forecastHourly", "forecastGridData", "gridId", "gridX", "gridY", "radarStation")
+
+# Most recent request timings, newest last. Each entry is a dict with
+# url, status, seconds and bytes (None for streamed responses).
+timings = deque(maxlen=TIMING_HISTORY)
+
+# Freshness headers of the last response for each URL, for weather.scheduler.
+CACHE_HEADERS = ("Cache-Control", "Expires", "Date", "Age", "Last-Modified", "ETag")
+response_headers = {}
+
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+_ijson = None  # the ijson module once imported, False when it isn't installed
+
+
+def _accept_encoding():
+    try:
+        import brotli  # noqa: F401  (urllib3 decodes "br" only when this is installed)
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+def _get_ijson():
+    """The optional ijson module, or None. A failed import is remembered rather than retried on every fetch."""
+    global _ijson
+    if _ijson is None:
+        try:
+            import ijson  # optional: parses the gridpoint body incrementally
+            _ijson = ijson
+        except ImportError:
+            _ijson = False
+    return _ijson or None
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": _accept_encoding()})
+            _session = session
+        return _session
+
+
+def endpoint_name(url):
+    """Coarse endpoint class of an NWS URL, used as the metrics stage name."""
+    if "/points/" in url: return "points"
+    if url.endswith("/forecast/hourly"): return "forecast_hourly"
+    if url.endswith("/forecast"): return "forecast"
+    if "/gridpoints/" in url: return "gridpoints"
+    if "/radar/stations" in url: return "radar_stations"
+    if "/alerts" in url: return "alerts"
+    if url.endswith(".gif"): return "radar_image"
+    return "other"
+
+
+def fetch(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET a URL on the shared session, record its timing and raise on HTTP errors."""
+    start = time.perf_counter()
+    response = get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+    elapsed = time.perf_counter() - start
+    size = len(response.content) if not kwargs.get("stream") else None
+    timings.append({
+        "url": url,
+        "status": response.status_code,
+        "seconds": elapsed,
+        "bytes": size,
+    })
+    stage = f"request_{endpoint_name(url)}"
+    metrics.observe(stage, elapsed)  # for streamed responses this is time to headers only
+    metrics.add_bytes(stage, size)
+    response_headers[url] = {name: response.headers[name] for name in CACHE_HEADERS if name in response.headers}
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()  # an unread streamed body would otherwise keep its pooled connection
+        raise
+    return response
+
+
+def fetch_json(url, headers=None, timeout=DEFAULT_TIMEOUT):
+    """GET a URL and decode its JSON body."""
+    response = fetch(url, headers=headers, timeout=timeout)
+    with metrics.timed("json_parse"):
+        return response.json()
+
+
+def _get_executor():
+    global _executor
+    with _session_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix="nws")
+        return _executor
+
+
+def run_concurrently(calls, deadline=FETCH_DEADLINE):
+    """Run several fetches in parallel under one overall deadline.
+
+    `calls` maps a name to a zero-argument callable. Returns a dict mapping each
+    name to either the call's result or the exception it raised; calls still
+    running when the deadline passes are reported as TimeoutError.
+    """
+    from concurrent.futures import wait
+    executor = _get_executor()
+    futures = {name: executor.submit(call) for name, call in calls.items()}
+    wait(futures.values(), timeout=deadline)
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            results[name] = TimeoutError(f"'{name}' did not finish within {deadline}s")
+        elif future.exception() is not None:
+            results[name] = future.exception()
+        else:
+            results[name] = future.result()
+    return results
+
+
+def _retryable(error):
+    """Timeouts, connection failures, HTTP 5xx and 429 are worth another try; other errors are not."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        return response.status_code >= 500 or response.status_code == 429
+    return isinstance(error, OSError)  # requests' exceptions and TimeoutError are all OSErrors
+
+
+def call_with_budget(call, budget, retries=RETRIES, hedge_after=HEDGE_AFTER):
+    """Run `call(timeout)` until it succeeds or `budget` seconds are spent.
+
+    Transient failures are retried after a jittered exponential backoff. If
+    an attempt is still running after `hedge_after` seconds, a second one is
+    raced against it and whichever answers first wins. At most 1 + `retries`
+    attempts are made. Raises the last error, or TimeoutError when the
+    budget runs out first.
+    """
+    deadline = time.monotonic() + budget
+    outcomes = queue.Queue()
+
+    def attempt():
+        try:
+            outcomes.put((True, call(max(0.1, deadline - time.monotonic()))))
+        except Exception as e:
+            outcomes.put((False, e))
+
+    def launch():
+        threading.Thread(target=attempt, name="nws-attempt", daemon=True).start()
+
+    launch()
+    attempts, in_flight, hedged, error = 1, 1, False, None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"no response within the {budget}s budget") from error
+        wait = remaining if hedged or in_flight != 1 else min(remaining, hedge_after)
+        try:
+            ok, value = outcomes.get(timeout=wait)
+        except queue.Empty:
+            if not hedged and in_flight == 1 and attempts <= retries:
+                launch()
+                attempts, in_flight, hedged = attempts + 1, in_flight + 1, True
+            continue
+        in_flight -= 1
+        if ok:
+            return value
+        error = value
+        if in_flight:
+            continue  # a hedged attempt is still running
+        if not _retryable(error) or attempts > retries:
+            raise error
+        time.sleep(min(random.uniform(0, RETRY_BACKOFF * 2 ** (attempts - 1)), max(0, deadline - time.monotonic())))
+        launch()
+        attempts, in_flight = attempts + 1, 1
+
+
+def fetch_json_concurrently(urls, headers=None, deadline=FETCH_DEADLINE):
+    """Fetch several JSON documents in parallel; `urls` maps a name to a URL.
+
+    See run_concurrently() for the shape of the result.
+    """
+    timeout = min(DEFAULT_TIMEOUT, deadline)
+    return run_concurrently(
+        {name: partial(fetch_json, url, headers, timeout) for name, url in urls.items()}, deadline
+    )
+
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` calls per second, in bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller may make one call."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1  # may go negative: a reservation that later callers queue behind
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+    def limit(self, call):
+        """Wrap a zero-argument callable so that it acquires a token first."""
+        def limited():
+            self.acquire()
+            return call()
+        return limited
+
+
+def fetch_grid_layers(url, names, headers=None, timeout=DEFAULT_TIMEOUT):
+    """Fetch a forecastGridData document, keeping only the layers in `names`.
+
+    Returns a dict of layer name to raw layer. With ijson installed the body is
+    parsed from the response stream one layer at a time; unwanted layers are
+    still built, but each is dropped as soon as it is read, so peak memory is
+    bounded by the largest single layer instead of the whole document. (Skipping
+    them event by event with ijson.parse() avoids building them but costs more
+    CPU than it saves.) Without ijson this falls back to a full .json() parse.
+    """
+    ijson = _get_ijson()
+    if ijson is None:
+        properties = fetch_json(url, headers=headers, timeout=timeout)['properties']
+        return {name: properties[name] for name in names if name in properties}
+    response = fetch(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        response.raw.decode_content = True
+        with metrics.timed("grid_extract"):  # download and parse are interleaved here
+            return {
+                name: layer
+                for name, layer in ijson.kvitems(response.raw, 'properties', use_float=True)
+                if name in names
+            }
+    finally:
+        metrics.add_bytes("request_gridpoints", response.raw.tell())  # bytes on the wire
+        response.close()
+
+
+def get_point_properties(lat, lon, headers=None):
+    """Resolve a location to its NWS forecast office grid, using the disk cache.
+
+    Only the fields in POINT_FIELDS are kept. Call invalidate_point() when a
+    URL taken from the result stops working so the next call re-resolves it.
+    """
+    key = cache.points_key(lat, lon)
+    properties = cache.get(key, cache.POINTS_TTL)
+    if properties is None:
+        full = fetch_json(f"{API_BASE}/points/{lat},{lon}", headers=headers)['properties']
+        properties = {field: full.get(field) for field in POINT_FIELDS}
+        cache.put(key, properties)
+    return properties
+
+
+def invalidate_point(lat, lon, error=None):
+    """Drop the cached grid for a location.
+
+    When `error` is given, only an HTTP 4xx (a moved or retired grid) counts;
+    timeouts and server errors leave the cache alone so outages don't force
+    extra /points lookups.
+    """
+    if error is not None:
+        response = getattr(error, "response", None)
+        if response is None or not 400 <= response.status_code < 500:
+            return
+    cache.invalidate(cache.points_key(lat, lon))
+
+
+def close():
+    """Close the shared session and drop its pooled connections."""
+    global _session, _executor
+    with _session_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+"""Radar station lookup and radar image fetching.
+
+Stations are indexed with a small 3-d KD-tree over unit-sphere coordinates.
+The tree is implicit: rows are stored so that the median of every sub-range
+is its node, which means the persisted row order *is* the index and loading
+it needs no sorting.
+
+Radar images and loops are fetched with conditional requests and kept
+already resized in a small LRU keyed by URL and validator, so an unchanged
+image costs a 304 and no decoding.
+"""
+import hashlib
+import heapq
+import io
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from . import cache, metrics, nws
+
+# --- Configuration ---
+EARTH_RADIUS_KM = 6371.0
+RADAR_FALLBACK_STATIONS = 3  # nearest stations to try when one's image is down
+RADAR_BASE = os.environ.get("WEATHER_RADAR_BASE", "https://radar.weather.gov")
+RADAR_IMAGE_URL = RADAR_BASE + "/ridge/standard/{station}_0.gif"
+RADAR_LOOP_URL = RADAR_BASE + "/ridge/standard/{station}_loop.gif"
+RADAR_LOOP_FRAMES = 10  # most recent loop frames kept for playback
+INDEX_CACHE_KEY = "radar_index"
+RADAR_IMAGE_CACHE_SIZE = 4  # resized images kept in memory
+
+_index = None
+_index_loaded = 0
+_validators = {}         # url -> (etag, last_modified) of the image we hold for it
+_images = OrderedDict()  # (url, validator) -> resized image or loop frames, least recently used first
+_frames = {}             # pixel digest -> resized loop frame, for the newest loop only
+_images_lock = threading.Lock()
+
+
+def _unit_vector(lat, lon):
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord_sq):
+    return EARTH_RADIUS_KM * 2 * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+class StationIndex:
+    """k-nearest radar station lookup by great-circle distance."""
+
+    def __init__(self, rows):
+        # `rows` are [id, lat, lon] already in KD-tree order (see build()).
+        self.rows = rows
+        self.vectors = [_unit_vector(lat, lon) for _, lat, lon in rows]
+
+    @classmethod
+    def build(cls, rows):
+        """Arrange unordered [id, lat, lon] rows into KD-tree order and index them."""
+        keyed = [(_unit_vector(row[1], row[2]), row) for row in rows]
+
+        def arrange(lo, hi, depth):
+            if hi - lo <= 1:
+                return
+            axis = depth % 3
+            keyed[lo:hi] = sorted(keyed[lo:hi], key=lambda item: item[0][axis])
+            mid = (lo + hi) // 2
+            arrange(lo, mid, depth + 1)
+            arrange(mid + 1, hi, depth + 1)
+
+        arrange(0, len(keyed), 0)
+        return cls([row for _, row in keyed])
+
+    def nearest(self, lat, lon, k=1):
+        """Return up to `k` (station_id, distance_km) pairs, nearest first."""
+        query = _unit_vector(lat, lon)
+        heap = []  # max-heap of (-chord_sq, index) holding the best k so far
+        vectors = self.vectors
+
+        def search(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            v = vectors[mid]
+            d_sq = (query[0] - v[0]) ** 2 + (query[1] - v[1]) ** 2 + (query[2] - v[2]) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d_sq, mid))
+            elif d_sq < -heap[0][0]:
+                heapq.heapreplace(heap, (-d_sq, mid))
+            diff = query[depth % 3] - v[depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            search(near[0], near[1], depth + 1)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                search(far[0], far[1], depth + 1)
+
+        search(0, len(vectors), 0)
+        return [(self.rows[i][0], _chord_to_km(-neg)) for neg, i in sorted(heap, reverse=True)]
+
+    def nearest_many(self, coords, k=1):
+        """Batch form of nearest() for an iterable of (lat, lon) pairs."""
+        return [self.nearest(lat, lon, k) for lat, lon in coords]
+
+
+def get_station_index():
+    """Return the station index from memory or the disk cache, or None if it must be fetched."""
+    global _index, _index_loaded
+    if _index is not None and time.time() - _index_loaded < cache.STATIONS_TTL:
+        return _index
+    rows = cache.get(INDEX_CACHE_KEY, cache.STATIONS_TTL)
+    if rows is None:
+        return None
+    _index, _index_loaded = StationIndex(rows), time.time()
+    return _index
+
+
+def store_station_index(geojson):
+    """Build the index from a /radar/stations response, persist and return it."""
+    global _index, _index_loaded
+    rows = [
+        [feature['properties']['id'], feature['geometry']['coordinates'][1], feature['geometry']['coordinates'][0]]
+        for feature in geojson['features']
+    ]
+    _index, _index_loaded = StationIndex.build(rows), time.time()
+    cache.put(INDEX_CACHE_KEY, _index.rows)
+    return _index
+
+
+def image_urls(index, lat, lon, k=RADAR_FALLBACK_STATIONS, template=RADAR_IMAGE_URL):
+    """Radar image URLs for the `k` nearest stations, nearest first."""
+    return [template.format(station=station) for station, _ in index.nearest(lat, lon, k)]
+
+
+def _resize(data, width):
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    h_size = int(img.size[1] * width / img.size[0])
+    # draft() lets JPEG sources decode at reduced scale and reducing_gap does a cheap
+    # integer reduce() before the LANCZOS pass; both are no-ops for RIDGE's palette GIFs.
+    img.draft("RGB", (width, h_size))
+    with metrics.timed("radar_decode"):
+        img.load()
+    with metrics.timed("radar_resize"):
+        return img.resize((width, h_size), Image.LANCZOS, reducing_gap=2.0)
+
+
+def _decode_loop(data, width, max_frames):
+    """Decode the last `max_frames` frames of an animated GIF as (digest, resized image) pairs."""
+    from PIL import Image, ImageSequence
+    img = Image.open(io.BytesIO(data))
+    first = max(0, getattr(img, "n_frames", 1) - max_frames)
+    frames = []
+    for i, frame in enumerate(ImageSequence.Iterator(img)):
+        if i < first:
+            continue  # GIF frames must still be decoded in order, but need no resize
+        with metrics.timed("radar_decode"):
+            rgb = frame.convert("RGB")
+        digest = hashlib.md5(rgb.tobytes()).hexdigest()
+        with _images_lock:
+            resized = _frames.get(digest)
+        if resized is None:
+            h_size = int(rgb.size[1] * width / rgb.size[0])
+            with metrics.timed("radar_resize"):
+                resized = rgb.resize((width, h_size), Image.LANCZOS, reducing_gap=2.0)
+        frames.append((digest, resized))
+    with _images_lock:
+        # Only frames from the newest loop are kept, so this stays at most max_frames entries.
+        _frames.clear()
+        _frames.update(frames)
+    return frames
+
+
+def _fetch_decoded(urls, decode):
+    """Fetch the first available URL with a conditional GET and decode it.
+
+    Returns (key, decoded) where `key` changes only when the content does, or
+    (None, None) if no URL answered. Unchanged content is served from the LRU
+    without being decoded again.
+    """
+    for url in urls:
+        headers = {}
+        etag, last_modified = _validators.get(url, (None, None))
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+        try:
+            response = nws.fetch(url, headers=headers)
+            if response.status_code == 304:
+                key = (url, etag or last_modified)
+                with _images_lock:
+                    if key in _images:
+                        _images.move_to_end(key)
+                        return key, _images[key]
+                response = nws.fetch(url)  # evicted meanwhile; fetch it unconditionally
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            key = (url, etag or last_modified or hashlib.md5(response.content).hexdigest())
+            with _images_lock:
+                decoded = _images.get(key)
+            if decoded is None:
+                decoded = decode(response.content)
+            with _images_lock:
+                _images[key] = decoded
+                _images.move_to_end(key)
+                while len(_images) > RADAR_IMAGE_CACHE_SIZE:
+                    _images.popitem(last=False)
+                _validators[url] = (etag, last_modified)
+            return key, decoded
+        except Exception as e:
+            print(f"--- Debug: Radar image unavailable at {url}: {e}")
+    return None, None
+
+
+def fetch_image(image_urls, width):
+    """Fetch the first available static radar image, resized to `width`.
+
+    Returns (key, image) or (None, None). Safe to call off the Tk thread.
+    """
+    return _fetch_decoded(image_urls, partial(_resize, width=width))
+
+
+def fetch_loop(loop_urls, width, max_frames=RADAR_LOOP_FRAMES):
+    """Fetch the first available radar loop as (key, [(digest, image), ...]).
+
+    Frames whose pixels were seen in the previous loop reuse their resized
+    image, and the digest lets the GUI reuse its PhotoImage too. Returns
+    (None, None) if no URL answered. Safe to call off the Tk thread.
+    """
+    return _fetch_decoded(loop_urls, partial(_decode_loop, width=width, max_frames=max_frames))
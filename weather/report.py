@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+"""Fetch and summarise the NWS forecast for one location, without any Tk dependency.
+
+fetch_products() keeps the latest hourly forecast, 7-day forecast and
+gridpoint layers in memory and refetches each one only when
+refresh_schedule says it is due, so the GUI summary, the LED schedule and
+the broker (which produces both) all share one set of upstream requests.
+"""
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+from functools import partial
+
+from . import history, metrics, nws, radar
+from .gridseries import GridData, convert
+from .scheduler import RefreshScheduler
+
+# --- Configuration ---
+HEADERS = {'User-Agent': 'MyWeatherGUI/1.0 (myemail@example.com)'}
+DEFAULT_REFRESH_INTERVAL = 600  # seconds; used when the server gives no freshness headers
+MIN_REFRESH_INTERVAL = 60  # seconds; never poll a product more often than this
+MAX_REFRESH_INTERVAL = 1800  # seconds; poll unchanged products at least this often
+GRID_LAYERS = (
+    'dewpoint', 'relativeHumidity', 'skyCover', 'windSpeed', 'windDirection', 'windGust',
+    'maxTemperature', 'minTemperature', 'apparentTemperature', 'surfacePressure',
+    'probabilityOfPrecipitation',
+)
+# Everything any consumer reads from forecastGridData, so one download serves them all.
+PRODUCT_GRID_LAYERS = GRID_LAYERS + ('hazards', 'quantitativePrecipitation', 'updateTime')
+PRODUCTS = ("hourly", "forecast", "grid")
+
+# Per-endpoint sub-budgets (seconds) inside the overall nws.FETCH_DEADLINE.
+ENDPOINT_BUDGETS = {"hourly": 10, "forecast": 10, "grid": 15, "stations": 15}
+
+refresh_schedule = RefreshScheduler(DEFAULT_REFRESH_INTERVAL, MIN_REFRESH_INTERVAL, MAX_REFRESH_INTERVAL)
+_products = {}  # name -> last successfully fetched document
+_fetched = {}   # name -> epoch that document was fetched
+_products_lock = threading.Lock()  # the GUI, its broker listener and the LED fetch may call in from different threads
+
+
+def budgeted(name, fetch):
+    """Wrap `fetch(timeout)` in nws.call_with_budget() with the sub-budget for endpoint `name`."""
+    return partial(nws.call_with_budget, fetch, min(ENDPOINT_BUDGETS.get(name, nws.FETCH_DEADLINE), nws.FETCH_DEADLINE))
+
+
+def fetch_products(lat, lon, headers=HEADERS, names=PRODUCTS, extra_calls=None, force=False):
+    """Fetch whatever products in `names` are due (all of them if `force`), within one overall deadline.
+
+    Returns (results, status). `results` maps each product that is available
+    (fresh, or an older copy when its refetch failed) to its document; "grid"
+    is the dict of PRODUCT_GRID_LAYERS from nws.fetch_grid_layers(). `status`
+    maps every name to {"state": "ok" | "stale" | "error", "fetched": epoch or
+    None, "error": message or None}. `extra_calls` (name -> callable) run in
+    the same concurrent fan-out and their results or exceptions are included
+    in `results` as-is. Only a failed /points lookup raises.
+    """
+    properties = nws.get_point_properties(lat, lon, headers=headers)
+    urls = {"hourly": properties['forecastHourly'], "forecast": properties['forecast'], "grid": properties['forecastGridData']}
+    calls = {
+        "hourly": budgeted("hourly", partial(nws.fetch_json, urls["hourly"], headers)),
+        "forecast": budgeted("forecast", partial(nws.fetch_json, urls["forecast"], headers)),
+        "grid": budgeted("grid", partial(nws.fetch_grid_layers, urls["grid"], PRODUCT_GRID_LAYERS, headers)),
+    }
+    with _products_lock:
+        calls = {name: calls[name] for name in names if force or name not in _products or refresh_schedule.is_due(name)}
+    calls.update(extra_calls or {})
+    fetched = nws.run_concurrently(calls)
+    for name in ("hourly", "forecast"):
+        document = fetched.get(name)
+        if document is not None and not isinstance(document, Exception) and not document.get('properties', {}).get('periods'):
+            fetched[name] = ValueError(f"no {name} periods in the response")  # nothing to show: fall back like a failed fetch
+    status = {}
+    with _products_lock:
+        results = {name: _products[name] for name in names if name in _products}
+        results.update((name, value) for name, value in fetched.items() if name not in names)
+        for name in names:
+            error = fetched.get(name)
+            if isinstance(error, Exception):
+                nws.invalidate_point(lat, lon, error)  # the grid may have moved
+                status[name] = {"state": "stale" if name in _products else "error", "fetched": _fetched.get(name), "error": str(error) or type(error).__name__}
+                continue
+            if name in fetched:
+                document = fetched[name]
+                update_time = document.get('updateTime') or document.get('properties', {}).get('updateTime')
+                refresh_schedule.record(name, nws.response_headers.get(urls[name]), update_time)
+                _products[name], _fetched[name] = document, time.time()
+                results[name] = document
+            status[name] = {"state": "ok", "fetched": _fetched[name], "error": None}
+    return results, status
+
+
+def period_series(periods):
+    """Compact parallel lists for the GUI forecast strip, one entry per forecast period.
+
+    Returns {"start": [epoch], "temp": [°F], "pop": [%], "day": [isDaytime]}.
+    Values are gathered into float arrays first and converted to °F in one
+    batched pass; missing values become None.
+    """
+    starts, temps, pops = array("d"), array("d"), array("d")
+    for period in periods:
+        starts.append(datetime.fromisoformat(period['startTime']).timestamp())
+        temp = period.get('temperature')
+        temps.append(math.nan if temp is None else temp)
+        pop = (period.get('probabilityOfPrecipitation') or {}).get('value')
+        pops.append(math.nan if pop is None else pop)
+    if periods and periods[0].get('temperatureUnit') == "C":
+        temps = convert(temps, 1.8, 32)
+    return {
+        "start": [int(t) for t in starts],
+        "temp": [None if math.isnan(t) else round(t, 1) for t in temps],
+        "pop": [None if math.isnan(p) else int(p) for p in pops],
+        "day": [bool(period.get('isDaytime', True)) for period in periods],
+    }
+
+
+def summarize(hourly, forecast, grid_props, radar_image_urls=(), radar_loop_urls=(), now=None):
+    """Build the GUI summary dict from already-fetched hourly, forecast and grid documents.
+
+    Any of the three may be None (or, for the forecasts, have no periods); the
+    keys derived from it are then left out.
+    Grid values that the layers don't provide for `now` are None.
+    """
+    now = time.time() if now is None else now
+    summary = {"radar_image_urls": list(radar_image_urls), "radar_loop_urls": list(radar_loop_urls)}
+    hourly_periods = hourly['properties'].get('periods') if hourly is not None else None
+    if hourly_periods:
+        summary["current_temp"] = hourly_periods[0]['temperature']
+        summary["short_forecast"] = hourly_periods[0]['shortForecast']
+        summary["hourly_strip"] = period_series(hourly_periods)
+    forecast_periods = forecast['properties'].get('periods') if forecast is not None else None
+    if forecast_periods:
+        summary["detailed_forecast"] = forecast_periods[0]['detailedForecast']
+        summary["daily_strip"] = period_series(forecast_periods)
+    if grid_props is not None:
+        with metrics.timed("grid_series"):
+            grid = GridData(grid_props, names=GRID_LAYERS)
+
+        def get_grid_value(prop, factor=1.0, offset=0.0):
+            # None, not a placeholder, when the layer is missing or doesn't cover `now`.
+            return grid.value_at(prop, now, default=None, factor=factor, offset=offset)
+
+        pressure = get_grid_value('surfacePressure', factor=0.02953)
+
+        summary.update({
+            "dewpoint_f": get_grid_value('dewpoint', factor=1.8, offset=32),
+            "humidity": get_grid_value('relativeHumidity'),
+            "sky_cover": get_grid_value('skyCover'),
+            "wind_speed_mph": get_grid_value('windSpeed', factor=0.621371),
+            "wind_direction": get_grid_value('windDirection'),
+            "wind_gust_mph": get_grid_value('windGust', factor=0.621371),
+            "max_temp": get_grid_value('maxTemperature', factor=1.8, offset=32),
+            "min_temp": get_grid_value('minTemperature', factor=1.8, offset=32),
+            "apparent_temp": get_grid_value('apparentTemperature', factor=1.8, offset=32),
+            "pressure_in": pressure if pressure is not None and pressure > 0 else None,
+            "prob_precip": get_grid_value('probabilityOfPrecipitation'),
+            "hazards": [f"{item.get('phenomenon', '')} {item.get('significance', '')}".strip() for sub in grid_props.get('hazards', {}).get('values', []) for item in sub.get('value', [])]
+        })
+    return summary
+
+
+def get_weather_data(lat, lon, headers=HEADERS, force=False):
+    """Summarise current conditions for the GUI as a JSON-serialisable dict.
+
+    Sections that could not be fetched are left out and reported in
+    "sections" (see fetch_products()); returns None only when nothing at all
+    is available. Each summary is also appended to the shared history
+    (weather/history.py), whose trends are included as "pressure_tendency"
+    and "temp_history". `force` refetches every product, whether due or not
+    (for an explicit "refresh now").
+    """
+    try:
+        station_index = radar.get_station_index()
+        extra_calls = {}
+        if station_index is None:
+            extra_calls["stations"] = budgeted("stations", partial(nws.fetch_json, nws.RADAR_STATIONS_URL, headers))
+        results, status = fetch_products(lat, lon, headers, extra_calls=extra_calls, force=force)
+        if not any(name in results for name in PRODUCTS):
+            raise RuntimeError("; ".join(f"{name}: {s['error']}" for name, s in status.items()))
+
+        radar_image_urls, radar_loop_urls = [], []
+        try:
+            if station_index is None:
+                if isinstance(results["stations"], Exception): raise results["stations"]
+                station_index = radar.store_station_index(results["stations"])
+            radar_image_urls = radar.image_urls(station_index, lat, lon)
+            radar_loop_urls = radar.image_urls(station_index, lat, lon, template=radar.RADAR_LOOP_URL)
+        except Exception as e:
+            print(f"--- Debug: Could not locate a radar station: {e}")
+
+        summary = summarize(results.get("hourly"), results.get("forecast"), results.get("grid"), radar_image_urls, radar_loop_urls)
+        summary["sections"] = status
+        history.record(summary)
+        summary.update(history.trends())
+        return summary
+    except Exception as e:
+        print(f"--- Debug: CRITICAL ERROR in get_weather_data: {e}") # Keep this debug for now
+        return None
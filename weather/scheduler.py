@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""Adaptive per-endpoint refresh scheduling.
+
+Instead of polling every product on one fixed interval, RefreshScheduler
+plans each endpoint's next fetch from what the server said about the last
+response: Cache-Control max-age (less Age) or Expires, falling back to a
+default interval. When a fetch returns the same product as before (same
+updateTime, Last-Modified or ETag) the interval backs off, so unchanged
+data is polled less and less often. Every interval is clamped to
+[min_interval, max_interval] and gets a little random jitter so that many
+clients don't poll in lock-step.
+"""
+import random
+import re
+import threading
+import time
+
+BACKOFF = 1.5  # interval growth after a fetch returned identical data
+JITTER = 0.1   # up to this fraction of the interval is added at random
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def freshness_lifetime(headers, now=None):
+    """Seconds from `now` until the response expires, per Cache-Control or Expires, or None."""
+    now = time.time() if now is None else now
+    match = _MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+    if match:
+        return max(0, int(match.group(1)) - int(headers.get("Age", 0) or 0))
+    expires = headers.get("Expires")
+    if expires:
+        from email.utils import parsedate_to_datetime  # ~6 ms to import; most NWS responses carry max-age
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            date = headers.get("Date")
+            served_at = parsedate_to_datetime(date).timestamp() if date else now
+            return max(0, expires_at - served_at)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class RefreshScheduler:
+    def __init__(self, default_interval, min_interval, max_interval):
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.endpoints = {}  # name -> {"validator", "interval", "next"}
+        self.lock = threading.Lock()  # record() and next_due() may run on different threads
+
+    def record(self, name, headers=None, update_time=None, now=None):
+        """Plan the next fetch of `name` after a successful response.
+
+        Returns True if the product changed since the previous fetch.
+        """
+        now = time.time() if now is None else now
+        headers = headers or {}
+        validator = update_time or headers.get("Last-Modified") or headers.get("ETag")
+        interval = freshness_lifetime(headers, now)
+        if interval is None:
+            interval = self.default_interval
+        with self.lock:
+            state = self.endpoints.get(name, {"validator": None, "interval": None})
+            changed = validator is None or validator != state["validator"]
+            if not changed and state["interval"]:
+                interval = max(interval, state["interval"] * BACKOFF)
+            interval = min(self.max_interval, max(self.min_interval, interval))
+
+            self.endpoints[name] = {
+                "validator": validator,
+                "interval": interval,
+                "next": now + interval + random.uniform(0, JITTER * interval),
+            }
+        return changed
+
+    def is_due(self, name, now=None):
+        with self.lock:
+            state = self.endpoints.get(name)
+        return state is None or (time.time() if now is None else now) >= state["next"]
+
+    def next_due(self, names=None):
+        """Epoch of the earliest planned fetch among `names` (default all), or None if unknown."""
+        with self.lock:
+            times = [state["next"] for name, state in self.endpoints.items() if names is None or name in names]
+        return min(times) if times else None
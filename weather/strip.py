@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""Scrollable hourly / 7-day forecast strip for the weather GUI.
+
+The strip is a single Canvas with one column per forecast period (a time
+label, the temperature and the chance of precipitation) under two
+sparklines. Canvas items are created the first time a column is needed and
+reused from then on: a redraw only retexts columns whose value changed,
+hides or shows the columns past the end, and moves the two sparklines with
+coords(). Nothing is deleted and recreated, so redrawing 150+ hourly
+periods stays cheap on a Pi.
+"""
+import time
+import tkinter as tk
+
+# --- Configuration ---
+COLUMN_WIDTH = 44  # px per forecast period
+HEIGHT = 112
+LABEL_Y, TEMP_Y, POP_Y = 8, 22, 104
+TEMP_TOP, TEMP_BOTTOM = 36, 66  # y range of the temperature sparkline
+POP_TOP, POP_BOTTOM = 72, 94    # y range of the precipitation sparkline (0-100%)
+COLOR_TEMP = "#D08770"
+COLOR_POP = "#81A1C1"
+SCROLL_UNITS = 3
+
+
+def scale(values, top, bottom, low=None, high=None):
+    """Map `values` to y pixels, `high` at `top` and `low` at `bottom` (default: their range); None stays None."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return [None] * len(values)
+    low = min(present) if low is None else low
+    high = max(present) if high is None else high
+    k = (bottom - top) / ((high - low) or 1.0)
+    return [None if v is None else bottom - (v - low) * k for v in values]
+
+
+def line_points(ys, step):
+    """Flat x, y coordinates for Canvas.coords(), one point every `step` px, skipping None."""
+    return [coord for i, y in enumerate(ys) if y is not None for coord in (i * step + step / 2, y)]
+
+
+def column_labels(series, hourly):
+    if hourly:
+        return ["Now" if i == 0 else time.strftime("%I%p", time.localtime(t)).lstrip("0").lower()
+                for i, t in enumerate(series["start"])]
+    return [time.strftime("%a" if day else "%a night", time.localtime(t)) for t, day in zip(series["start"], series["day"])]
+
+
+class ForecastStrip(tk.Frame):
+    def __init__(self, parent, width, bg, fg, title_font, label_font, value_font):
+        super().__init__(parent, bg=bg, bd=1, relief="solid", padx=10, pady=10)
+        self.fg = fg
+        self.label_font = label_font
+        self.value_font = value_font
+        self.series = {"hourly": None, "daily": None}
+        self.mode = "hourly"
+        self.drawn = None  # (mode, series) currently on the canvas
+        self.columns = []  # (label, temp, pop) item ids, one triple per column ever needed
+        self.visible = 0   # columns currently shown
+        self.texts = {}    # item id -> text it shows
+
+        header = tk.Frame(self, bg=bg)
+        header.pack(fill="x")
+        self.title_var = tk.StringVar(value="Hourly")
+        tk.Label(header, textvariable=self.title_var, font=title_font, bg=bg, fg=fg).pack(side="left")
+        self.mode_button = tk.Button(header, text="7-Day", command=self.toggle_mode, font=label_font)
+        self.mode_button.pack(side="right")
+        self.canvas = tk.Canvas(self, width=width, height=HEIGHT, bg=bg, highlightthickness=0,
+                                xscrollincrement=COLUMN_WIDTH)
+        self.canvas.pack(fill="x")
+        scrollbar = tk.Scrollbar(self, orient="horizontal", command=self.canvas.xview)
+        scrollbar.pack(fill="x")
+        self.canvas.configure(xscrollcommand=scrollbar.set)
+        for sequence in ("<Button-4>", "<Button-5>", "<MouseWheel>"):
+            self.canvas.bind(sequence, self.scroll)
+        self.temp_line = self.canvas.create_line(0, 0, 0, 0, fill=COLOR_TEMP, width=2, state="hidden")
+        self.pop_line = self.canvas.create_line(0, 0, 0, 0, fill=COLOR_POP, width=2, state="hidden")
+
+    def has_data(self):
+        return any(series is not None for series in self.series.values())
+
+    def set_series(self, hourly=None, daily=None):
+        """Take new period_series() data; None leaves that mode's current data in place."""
+        if hourly is not None: self.series["hourly"] = hourly
+        if daily is not None: self.series["daily"] = daily
+        if self.series[self.mode] is None and self.has_data():
+            self.toggle_mode()
+        else:
+            self.draw()
+
+    def toggle_mode(self):
+        self.mode = "daily" if self.mode == "hourly" else "hourly"
+        self.title_var.set("Hourly" if self.mode == "hourly" else "7-Day")
+        self.mode_button.config(text="7-Day" if self.mode == "hourly" else "Hourly")
+        self.canvas.xview_moveto(0)
+        self.draw()
+
+    def scroll(self, event):
+        back = event.num == 4 or event.delta > 0
+        self.canvas.xview_scroll(-SCROLL_UNITS if back else SCROLL_UNITS, "units")
+
+    def set_text(self, item, text):
+        if self.texts.get(item) != text:
+            self.texts[item] = text
+            self.canvas.itemconfigure(item, text=text)
+
+    def set_line(self, line, ys):
+        points = line_points(ys, COLUMN_WIDTH)
+        if len(points) < 4:
+            self.canvas.itemconfigure(line, state="hidden")
+            return
+        self.canvas.coords(line, *points)
+        self.canvas.itemconfigure(line, state="normal")
+
+    def draw(self):
+        series = self.series[self.mode]
+        if series is None or self.drawn == (self.mode, series):
+            return
+        self.drawn = (self.mode, series)
+        n = len(series["start"])
+        while len(self.columns) < n:
+            x = len(self.columns) * COLUMN_WIDTH + COLUMN_WIDTH / 2
+            self.columns.append((
+                self.canvas.create_text(x, LABEL_Y, font=self.label_font, fill=self.fg, state="hidden"),
+                self.canvas.create_text(x, TEMP_Y, font=self.value_font, fill=COLOR_TEMP, state="hidden"),
+                self.canvas.create_text(x, POP_Y, font=self.label_font, fill=COLOR_POP, state="hidden"),
+            ))
+        labels = column_labels(series, self.mode == "hourly")
+        for (label, temp, pop), text, t, p in zip(self.columns, labels, series["temp"], series["pop"]):
+            self.set_text(label, text)
+            self.set_text(temp, "" if t is None else f"{t:.0f}°")
+            self.set_text(pop, f"{p}%" if p else "")
+        for i in range(min(n, self.visible), max(n, self.visible)):
+            state = "normal" if i < n else "hidden"
+            for item in self.columns[i]:
+                self.canvas.itemconfigure(item, state=state)
+        self.visible = n
+        self.set_line(self.temp_line, scale(series["temp"], TEMP_TOP, TEMP_BOTTOM))
+        self.set_line(self.pop_line, scale(series["pop"], POP_TOP, POP_BOTTOM, 0, 100))
+        self.canvas.configure(scrollregion=(0, 0, n * COLUMN_WIDTH, HEIGHT))